@@ -0,0 +1,375 @@
+"""
+Per-frame work benchmarks of lib/, run under CPython on the simulated hardware in host/.
+
+    python bench/run.py [--frames N] [case ...]
+
+Every case sets up its objects, then runs N frames of its per-frame work followed by a
+simulated vblank, and checks the simulated memory / registers against what it drew, so a case
+that does less work by skipping an upload fails too. The hardware counters (register stores,
+bytes moved, BIOS calls ...) are deterministic, so they are checked against BUDGETS and the
+exit code is 1 when a case does more work per frame than its budget, or a check fails.
+Wall times are host times, only for comparison.
+"""
+import os
+import sys
+import time
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "host"), os.path.join(ROOT, "lib"), os.path.join(ROOT, "tools")]
+
+import gba_host
+from array import array
+from uctypes import bytearray_at
+
+# worst frame allowed for each case, counters not listed are not checked
+BUDGETS = {
+    "bgmap_edits": {"bytes_moved": 320, "bios_calls": 1, "reg_writes": 0},
+    "bgmap_fill": {"bytes_moved": 1280, "bios_calls": 1, "reg_writes": 0},
+    "tiles_pack": {"bytes_moved": 16384, "bios_calls": 1, "mem_writes": 0},
+    "mode4_text": {"bytes_moved": 1920, "dma_transfers": 1, "reg_writes": 4},
+    "keypad_poll": {"reg_reads": 1, "reg_writes": 0},
+    "reg_commit": {"reg_writes": 1, "bytes_moved": 0},
+    "sprites": {"bytes_moved": 1024, "bios_calls": 1, "mem_writes": 0},
+    "dma_queue": {"bytes_moved": 4096, "dma_transfers": 8, "reg_writes": 24},
+    "world_scroll": {"bytes_moved": 2048, "bios_calls": 1, "reg_writes": 1},
+    "affine_rotate": {"bytes_moved": 16, "bios_calls": 1, "dma_transfers": 1},
+    "dma_budget": {"bytes_moved": 1024, "dma_transfers": 2, "reg_writes": 6},
+    "scanline_wave": {"reg_writes": 5, "bios_calls": 0, "dma_transfers": 160},
+    "uncomp_tiles": {"bytes_moved": 4096, "bios_calls": 1, "dma_transfers": 0},
+}
+
+
+def _memory(addr: int, size: int) -> bytes:
+    return bytes(bytearray_at(addr, size))
+
+
+def _scramble(addr: int, size: int):
+    """ overwrite memory without counting it, so the next frame has to upload again """
+    gba_host.raw_copy_in(addr, b"\xA5" * size)
+
+
+def bgmap_edits():
+    """ main.py's loop: 5 random tile edits on a 64x64 map, then flush """
+    from gba_video import BGMap, BG_MAP_ADDR
+    bg_map = BGMap(16, 64, 64, True)
+    bg_map.update_all()
+    rng = random.Random(1)
+
+    def frame():
+        for i in range(1, 6):
+            bg_map.set_bg_tile_at(i, i, rng.randint(1, 16))
+        bg_map.flush()
+
+    def check():
+        assert _memory(BG_MAP_ADDR + 16 * 2048, len(bg_map)) == bytes(bg_map.buffer), "vram map differs"
+    return frame, check
+
+
+def bgmap_fill():
+    """ refill the visible 30x20 window of a 32x32 map every frame """
+    from gba_video import BGMap, BG_MAP_ADDR, regular_bg_entry
+    bg_map = BGMap(16, 32, 32, True)
+    bg_map.update_all()
+    tile = [0]
+
+    def frame():
+        tile[0] = (tile[0] + 1) & 0xFF
+        bg_map.fill_rect(0, 0, 30, 20, regular_bg_entry(tile[0]))
+        bg_map.flush()
+
+    def check():
+        assert bg_map.buffer[19 * 32 + 29] == regular_bg_entry(tile[0]), "fill missed"
+        assert _memory(BG_MAP_ADDR + 16 * 2048, len(bg_map)) == bytes(bg_map.buffer), "vram map differs"
+    return frame, check
+
+
+def tiles_pack():
+    """ pack 256 tiles from one 16x16 tile image and upload the char block """
+    from gba_video import Tile, TileManager, BG_TILE_ADDR
+    tiles = TileManager(0)
+    image = Tile(16, 16)
+    for row in range(16):
+        image.text("0123456789ABCDEF", 0, row * 8, 1 + row)
+
+    def frame():
+        tiles.set_tile_data(image, 0)
+        tiles.update_all()
+
+    def check():
+        assert _memory(BG_TILE_ADDR, len(tiles)) == bytes(tiles.buffer), "vram tiles differ"
+        _scramble(BG_TILE_ADDR, len(tiles))
+    return frame, check
+
+
+def mode4_text():
+    """ one line of text redrawn on the mode 4 page, then show """
+    from gba_video import DisplayMode4, FRAMEBUF0_ADDR, FRAMEBUF1_ADDR
+    from machine import mem16
+    disp = DisplayMode4()
+    disp.init_display()
+    disp.clear()
+    disp.show()
+    count = [0]
+
+    def frame():
+        count[0] += 1
+        disp.fill_rect(16, 72, 128, 8, 0)
+        disp.text("frame {}".format(count[0]), 16, 72, 1)
+        disp.show()
+
+    def check():
+        page = FRAMEBUF1_ADDR if mem16[0x04000000] & (1 << 4) else FRAMEBUF0_ADDR
+        assert _memory(page, 240 * 160) == bytes(disp.buffer), "shown page differs"
+    return frame, check
+
+
+def keypad_poll():
+    """ poll with keys going down and up """
+    import gba_keypad
+    pattern = (0, gba_keypad.KEY_A, gba_keypad.KEY_A | gba_keypad.KEY_RIGHT, gba_keypad.KEY_RIGHT)
+    count = [0]
+    events = [0]
+    gba_keypad.enable_event_buffer(16)
+
+    def frame():
+        count[0] += 1
+        gba_host.set_keys(pattern[(count[0] >> 2) & 0b11])
+        gba_keypad.poll()
+        events[0] = 0
+        while not gba_keypad.read_event() & gba_keypad.EVENT_NONE:
+            events[0] += 1
+
+    def check():
+        keys = pattern[(count[0] >> 2) & 0b11]
+        assert gba_keypad.key_held == keys, "held keys differ"
+        if count[0] & 0b11 == 0:
+            # the pattern changes every 4 frames, one key goes down or up
+            assert events[0] == 1, "missed key event"
+        else:
+            assert events[0] == 0 and gba_keypad.key_pressed == 0, "spurious key event"
+    return frame, check
+
+
+def reg_commit():
+    """ scroll one background, commit the register shadows """
+    import gba_reg
+    from machine import mem32
+    count = [0]
+
+    def frame():
+        count[0] += 1
+        gba_reg.REG_BG0OFS.HOFS = count[0] & 0x1FF
+        gba_reg.REG_BG0OFS.VOFS = (count[0] >> 1) & 0x1FF
+        gba_reg.commit()
+
+    def check():
+        assert mem32[0x04000010] == (count[0] & 0x1FF) | (((count[0] >> 1) & 0x1FF) << 16), "BG0OFS differs"
+    return frame, check
+
+
+def sprites():
+    """ move 32 sprites in the shadow OAM, upload it """
+    from gba_sprite import SpriteManager, OAM_ADDR, OAM_SIZE
+    manager = SpriteManager()
+    ids = [manager.alloc() for _ in range(32)]
+    for i in ids:
+        manager.set(i, i * 7, i * 4, i)
+    count = [0]
+
+    def frame():
+        count[0] += 1
+        for i in ids:
+            manager.set_position(i, (i * 7 + count[0]) & 0x1FF, (i * 4 + count[0]) & 0xFF)
+        manager.upload()
+
+    def check():
+        assert _memory(OAM_ADDR, OAM_SIZE) == bytes(manager.oam), "oam differs"
+    return frame, check
+
+
+def dma_queue():
+    """ 8 queued uploads of 512 bytes, flushed in one go """
+    from gba_dma import DMAQueue
+    queue = DMAQueue()
+    buffers = [array("H", range(i, i + 256)) for i in range(8)]
+
+    def frame():
+        for i in range(8):
+            queue.enqueue(buffers[i], 0x06008000 + i * 512, 512)
+        queue.flush()
+
+    def check():
+        assert len(queue) == 0, "queue not empty"
+        assert _memory(0x06008000, 8 * 512) == b"".join(bytes(b) for b in buffers), "vram differs"
+        _scramble(0x06008000, 8 * 512)
+    return frame, check
+
+
+def dma_budget():
+    """ 2 KB queued every other frame, flushed with a 1 KB budget: the rest carries over """
+    from gba_dma import DMAQueue
+    queue = DMAQueue(byte_budget=1024)
+    buffers = [array("H", [0] * 256) for i in range(4)]
+    count = [0]
+
+    def frame():
+        count[0] += 1
+        if count[0] & 1:
+            for i in range(4):
+                buffers[i][0] = count[0]
+                buffers[i][255] = i
+                queue.enqueue(buffers[i], 0x06008000 + i * 512, 512)
+        queue.flush()
+
+    def check():
+        expected = b"".join(bytes(b) for b in buffers)
+        if count[0] & 1:
+            assert len(queue) == 2 and _memory(0x06008000, 1024) == expected[:1024], "first half not moved"
+        else:
+            assert len(queue) == 0 and _memory(0x06008000, 2048) == expected, "carried over half not moved"
+    return frame, check
+
+
+def world_scroll():
+    """ diagonal scroll over a 256x256 tiles world through a 32x32 map """
+    from gba_video import BGMap, BG_MAP_ADDR
+    from gba_scroll import WorldScroller, VIEW_TILE_W, VIEW_TILE_H
+    from machine import mem32
+    world = array("H", [i & 0x03FF for i in range(256 * 256)])
+    bg_map = BGMap(16, 32, 32, True)
+    scroller = WorldScroller(bg_map, world, 256, 256)
+    scroller.scroll_to(0, 0)
+    scroller.commit()
+
+    def frame():
+        scroller.scroll_by(3, 2)
+        scroller.commit()
+
+    def check():
+        assert _memory(BG_MAP_ADDR + 16 * 2048, len(bg_map)) == bytes(bg_map.buffer), "vram map differs"
+        tile_x = scroller.x >> 3
+        tile_y = scroller.y >> 3
+        for y in range(tile_y, tile_y + VIEW_TILE_H):
+            for x in range(tile_x, tile_x + VIEW_TILE_W):
+                assert bg_map.buffer[(y & 31) * 32 + (x & 31)] == world[y * 256 + x], "view differs from world"
+        assert mem32[0x04000010] == (scroller.x & 0xFF) | ((scroller.y & 0xFF) << 16), "BG0OFS differs"
+    return frame, check
+
+
+def affine_rotate():
+    """ rotate and zoom BG2 every frame """
+    import gba_affine
+    from gba_affine import AffineBackground, compute, commit, REG_BG2PA
+    bg = AffineBackground(2)
+    bg.set_center(256, 256)
+    count = [0]
+
+    def frame():
+        count[0] += 1
+        bg.set_rotation(count[0])
+        bg.set_scale(0x100 + (count[0] & 0x7F))
+        compute()
+        commit()
+
+    def check():
+        assert _memory(REG_BG2PA, 16) == bytes(gba_affine._shadow)[:16], "BG2 registers differ"
+    return frame, check
+
+
+def scanline_wave():
+    """ per line BG1HOFS wave, drawn once, only the dma restart per frame """
+    from gba_dma import ScanlineEffect, REG_DMA0CNT, DMA_ENABLE
+    from gba_affine import lut_sin
+    from machine import mem16, mem32
+    effect = ScanlineEffect(0x04000014)
+    for line in range(161):
+        effect.set_line(line, lut_sin(line * 8) >> 5)
+    effect.present()
+
+    def frame():
+        effect.vblank()
+
+    def check():
+        # the last hblank transfer wrote row 160
+        assert mem16[0x04000014] == (lut_sin(160 * 8) >> 5) & 0xFFFF, "rows not streamed"
+        assert mem32[REG_DMA0CNT] & DMA_ENABLE, "dma not armed"
+    return frame, check
+
+
+def uncomp_tiles():
+    """ BIOS decompress 4 KB of LZ77 tiles straight to vram """
+    from gba_video import TileManager, BG_TILE_ADDR
+    from gba_compress import compress
+    tiles = TileManager(1, False)
+    data = bytes(((i >> 6) * 7 + (i & 7)) & 0xFF for i in range(4096))
+    blob = compress(data, "lz77")
+
+    def frame():
+        tiles.load_compressed(blob)
+
+    def check():
+        assert _memory(BG_TILE_ADDR + 16384, len(data)) == data, "decompressed tiles differ"
+        _scramble(BG_TILE_ADDR + 16384, len(data))
+    return frame, check
+
+
+CASES = (bgmap_edits, bgmap_fill, tiles_pack, mode4_text, keypad_poll, reg_commit, sprites, dma_queue,
+         dma_budget, world_scroll, affine_rotate, scanline_wave, uncomp_tiles)
+
+
+def run_case(case, frames: int):
+    """ return the worst frame counters, the mean frame time in us and the first failed check """
+    gba_host.reset()
+    frame, check = case()
+    # warm up, the first frame may still upload what the setup left
+    frame()
+    gba_host.vblank()
+    worst = dict.fromkeys(gba_host.Counters.FIELDS, 0)
+    total = 0
+    error = None
+    for _ in range(frames):
+        gba_host.counters.reset()
+        start = time.perf_counter()
+        frame()
+        total += time.perf_counter() - start
+        gba_host.vblank()
+        for name, value in gba_host.counters.snapshot().items():
+            worst[name] = max(worst[name], value)
+        if error is None:
+            try:
+                check()
+            except AssertionError as e:
+                error = str(e)
+    del worst["frames"]
+    return worst, total * 1000000 / frames, error
+
+
+def main(argv) -> int:
+    frames = 60
+    names = []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--frames":
+            frames = int(next(args))
+        else:
+            names.append(arg)
+    failed = 0
+    for case in CASES:
+        if names and case.__name__ not in names:
+            continue
+        worst, frame_us, error = run_case(case, frames)
+        budget = BUDGETS.get(case.__name__, {})
+        over = [name for name, limit in budget.items() if worst[name] > limit]
+        print("{:<12} {:>9.1f} us/frame  {}{}{}".format(
+            case.__name__, frame_us,
+            " ".join("{}={}".format(name, value) for name, value in worst.items()),
+            ("  OVER BUDGET: " + ", ".join(over)) if over else "",
+            ("  WRONG: " + error) if error else ""))
+        if over or error:
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
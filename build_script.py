@@ -1,8 +1,15 @@
+import os
+import sys
+sys.path.insert(0, "tools")
 from gba_mpy_tools.config import Config
 
+ASSET_MANIFEST = os.path.join("assets", "manifest.json")
+
 def before_build(cfg: Config):
-    # print("before_build")
-    pass
+    # convert the assets to lib/gba_assets.py (see tools/asset_pipeline.py)
+    if os.path.exists(ASSET_MANIFEST):
+        import asset_pipeline
+        print("assets:", asset_pipeline.build(ASSET_MANIFEST))
 
 def after_build(cfg: Config):
     # print("after_build")
@@ -0,0 +1,151 @@
+""" host stand-in of micropython's framebuf module, GS8 and RGB565 only
+
+the 8x8 glyphs are placeholders (a box with the character code inside),
+they have the size of the real font, not its shapes.
+"""
+from array import array
+
+GS8 = 6
+RGB565 = 1
+
+
+def _glyph(code: int) -> bytes:
+    if code <= 32 or code > 127:
+        return bytes(8)
+    rows = [0x7E, 0x42]
+    for i in range(4):
+        rows.append(0x42 | (((code >> (i * 2)) & 0b11) << 3))
+    rows += [0x7E, 0x00]
+    return bytes(rows)
+
+
+_FONT = [_glyph(code) for code in range(128)]
+
+
+class FrameBuffer():
+    def __init__(self, buffer, width: int, height: int, format: int, stride: int = None):
+        if format not in (GS8, RGB565):
+            raise ValueError("invalid format")
+        view = memoryview(buffer).cast("B")
+        self._buf = view if format == GS8 else view.cast("H")
+        self._mask = 0xFF if format == GS8 else 0xFFFF
+        self._width = width
+        self._height = height
+        self._stride = width if stride is None else stride
+        if len(self._buf) < self._stride * (height - 1) + width:
+            raise ValueError("buffer too small")
+
+    def fill(self, c):
+        self.fill_rect(0, 0, self._width, self._height, c)
+
+    def pixel(self, x, y, c=None):
+        if x < 0 or x >= self._width or y < 0 or y >= self._height:
+            return None
+        i = y * self._stride + x
+        if c is None:
+            return self._buf[i]
+        self._buf[i] = c & self._mask
+
+    def fill_rect(self, x, y, w, h, c):
+        if x < 0:
+            w += x
+            x = 0
+        if y < 0:
+            h += y
+            y = 0
+        w = min(w, self._width - x)
+        h = min(h, self._height - y)
+        if w <= 0 or h <= 0:
+            return
+        row = memoryview(array(self._buf.format, [c & self._mask] * w))
+        for yy in range(y, y + h):
+            i = yy * self._stride + x
+            self._buf[i: i + w] = row
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.fill_rect(x, y, w, 1, c)
+        self.fill_rect(x, y + h - 1, w, 1, c)
+        self.fill_rect(x, y, 1, h, c)
+        self.fill_rect(x + w - 1, y, 1, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x1, y1, c)
+            if x1 == x2 and y1 == y2:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    def ellipse(self, x, y, xr, yr, c, f=False, m=0b1111):
+        for dy in range(-yr, yr + 1):
+            dx = int(xr * (1 - (dy * dy) / (yr * yr or 1)) ** 0.5)
+            if f:
+                self.hline(x - dx, y + dy, 2 * dx + 1, c)
+            else:
+                self.pixel(x - dx, y + dy, c)
+                self.pixel(x + dx, y + dy, c)
+
+    def poly(self, x, y, coords, c, f=False):
+        points = list(coords)
+        n = len(points) // 2
+        for i in range(n):
+            j = (i + 1) % n
+            self.line(x + points[2 * i], y + points[2 * i + 1], x + points[2 * j], y + points[2 * j + 1], c)
+
+    def text(self, s, x, y, c=1):
+        for ch in s:
+            glyph = _FONT[ord(ch) & 0x7F]
+            for row in range(8):
+                bits = glyph[row]
+                if not bits:
+                    continue
+                for col in range(8):
+                    if bits & (0x80 >> col):
+                        self.pixel(x + col, y + row, c)
+            x += 8
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        for sy in range(fbuf._height):
+            ty = y + sy
+            if ty < 0 or ty >= self._height:
+                continue
+            for sx in range(fbuf._width):
+                tx = x + sx
+                if tx < 0 or tx >= self._width:
+                    continue
+                c = fbuf._buf[sy * fbuf._stride + sx]
+                if c != key:
+                    self._buf[ty * self._stride + tx] = c & self._mask
+
+    def scroll(self, xstep, ystep):
+        w = self._width
+        h = self._height
+        rows = [self._buf[r * self._stride: r * self._stride + w].tolist() for r in range(h)]
+        for r in range(h):
+            src_r = r - ystep
+            if src_r < 0 or src_r >= h:
+                continue
+            for col in range(w):
+                src_c = col - xstep
+                if 0 <= src_c < w:
+                    self._buf[r * self._stride + col] = rows[src_r][src_c]
+
@@ -0,0 +1,167 @@
+""" host stand-in of the gba module of micropython-gba, BIOS calls run on gba_host """
+import math
+import gba_host
+
+CSET_SRC_FIXED = 1 << 24
+IRQ_VBLANK = 1 << 0
+
+
+class _BIOS():
+
+    def vblank_intr_wait(self):
+        gba_host.counters.bios_calls += 1
+        gba_host.vblank()
+
+    def intr_wait(self, discard: int, flags: int):
+        # the simulated keypad is always ready, only vblank takes time
+        gba_host.counters.bios_calls += 1
+        if flags & IRQ_VBLANK:
+            gba_host.vblank()
+
+    def cpu_set_fast(self, source: int, destination: int, control: int):
+        """ CpuFastSet, word count rounded up to 8 words """
+        gba_host.counters.bios_calls += 1
+        count = ((control & 0x1FFFFF) + 7) & ~7
+        gba_host.transfer(source, destination, count, 4, 0 if control & CSET_SRC_FIXED else 1, 1)
+
+    def bg_affine_set(self, source: int, destination: int, count: int):
+        """ BgAffineSet, with a 1.14 sine table like the BIOS """
+        gba_host.counters.bios_calls += 1
+        for _ in range(count):
+            tex_x = _signed(gba_host.raw_read(source, 4), 32)
+            tex_y = _signed(gba_host.raw_read(source + 4, 4), 32)
+            scr_x, scr_y, scale_x, scale_y = (_signed(gba_host.raw_read(source + 8 + i * 2, 2), 16) for i in range(4))
+            angle = gba_host.raw_read(source + 16, 2) >> 8
+            sin = round(math.sin(angle * math.pi / 128) * 0x4000)
+            cos = round(math.cos(angle * math.pi / 128) * 0x4000)
+            pa = (cos * scale_x) >> 14
+            pb = -(sin * scale_x) >> 14
+            pc = (sin * scale_y) >> 14
+            pd = (cos * scale_y) >> 14
+            for i, value in enumerate((pa, pb, pc, pd)):
+                gba_host.raw_write(destination + i * 2, 2, value)
+            gba_host.raw_write(destination + 8, 4, tex_x - (pa * scr_x + pb * scr_y))
+            gba_host.raw_write(destination + 12, 4, tex_y - (pc * scr_x + pd * scr_y))
+            source += 20
+            destination += 16
+
+    def lz77_uncomp_wram(self, source: int, destination: int):
+        self._uncomp(source, destination, _lz77, False)
+
+    def lz77_uncomp_vram(self, source: int, destination: int):
+        self._uncomp(source, destination, _lz77, True)
+
+    def rl_uncomp_wram(self, source: int, destination: int):
+        self._uncomp(source, destination, _rl, False)
+
+    def rl_uncomp_vram(self, source: int, destination: int):
+        self._uncomp(source, destination, _rl, True)
+
+    def huff_uncomp(self, source: int, destination: int):
+        self._uncomp(source, destination, _huff, True)
+
+    def _uncomp(self, source: int, destination: int, decode, vram_safe: bool):
+        """ LZ77UnComp / RLUnComp / HuffUnComp, checked like the hardware would break """
+        gba_host.counters.bios_calls += 1
+        if source & 3:
+            raise ValueError("compressed data is not word aligned")
+        if gba_host.is_vram(destination) and not vram_safe:
+            raise ValueError("the wram routines write bytes, vram needs the vram routines")
+        if vram_safe and destination & 1:
+            raise ValueError("destination is not halfword aligned")
+        header = gba_host.raw_read(source, 4)
+        size = header >> 8
+        out = decode(lambda i: gba_host.raw_read(source + 4 + i, 1), header & 0xFF, size, vram_safe)
+        gba_host.raw_copy_in(destination, bytes(out[:size]))
+        gba_host.counters.bytes_moved += size
+
+
+def _lz77(read, kind: int, size: int, vram_safe: bool) -> bytearray:
+    if kind != 0x10:
+        raise ValueError("not LZ77 data")
+    out = bytearray()
+    i = 0
+    while len(out) < size:
+        flags = read(i)
+        i += 1
+        for bit in range(7, -1, -1):
+            if len(out) >= size:
+                break
+            if flags >> bit & 1:
+                a = read(i)
+                b = read(i + 1)
+                i += 2
+                length = (a >> 4) + 3
+                disp = (((a & 0xF) << 8) | b) + 1
+                if vram_safe and disp == 1:
+                    # the vram routine writes halfwords, the previous byte is not written yet
+                    raise ValueError("LZ77 reference to the previous byte breaks in vram")
+                if disp > len(out):
+                    raise ValueError("LZ77 reference before the start")
+                for _ in range(length):
+                    out.append(out[-disp])
+            else:
+                out.append(read(i))
+                i += 1
+    return out
+
+
+def _rl(read, kind: int, size: int, vram_safe: bool) -> bytearray:
+    if kind != 0x30:
+        raise ValueError("not RL data")
+    out = bytearray()
+    i = 0
+    while len(out) < size:
+        flag = read(i)
+        i += 1
+        if flag & 0x80:
+            out += bytes([read(i)]) * ((flag & 0x7F) + 3)
+            i += 1
+        else:
+            for _ in range((flag & 0x7F) + 1):
+                out.append(read(i))
+                i += 1
+    return out
+
+
+def _huff(read, kind: int, size: int, vram_safe: bool) -> bytearray:
+    bits = kind & 0x0F
+    if kind & 0xF0 != 0x20 or bits not in (4, 8):
+        raise ValueError("not Huffman data")
+    out = bytearray()
+    if size == 0:
+        return out
+    # the tree starts at byte 4 of the data (read index 0), the root at index 1
+    tree_end = (read(0) + 1) * 2
+    nibble = None
+    i = tree_end
+    node = 1
+    while len(out) < size:
+        word = read(i) | read(i + 1) << 8 | read(i + 2) << 16 | read(i + 3) << 24
+        i += 4
+        for bit in range(31, -1, -1):
+            entry = read(node)
+            direction = word >> bit & 1
+            child = (node & ~1) + (entry & 0x3F) * 2 + 2 + direction
+            if entry & (0x40 if direction else 0x80):
+                value = read(child)
+                node = 1
+                if bits == 8:
+                    out.append(value)
+                elif nibble is None:
+                    nibble = value & 0xF
+                else:
+                    out.append(nibble | (value & 0xF) << 4)
+                    nibble = None
+                if len(out) >= size:
+                    break
+            else:
+                node = child
+    return out
+
+
+def _signed(value: int, bits: int) -> int:
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+BIOS = _BIOS()
@@ -0,0 +1,293 @@
+"""
+Simulated GBA hardware for running lib/ under CPython.
+
+The memory map (EWRAM, IWRAM, I/O, palette, VRAM, OAM) lives in ctypes buffers.
+Python buffers (bytearray, array, bytes) get 32-bit addresses from 0x10000000 up when
+uctypes.addressof sees them, so they fit in DMA registers like on the GBA; they are
+kept alive from then on.
+DMA registers, the timers, VCOUNT and KEYINPUT have just enough behaviour for lib/,
+and every store / copy is counted in `counters`.
+"""
+import bisect
+import ctypes
+import time
+
+CPU_FREQ = 16777216
+
+REGIONS = (
+    # name, base, size
+    ("ewram", 0x02000000, 0x40000),
+    ("iwram", 0x03000000, 0x8000),
+    ("io", 0x04000000, 0x400),
+    ("palette", 0x05000000, 0x400),
+    ("vram", 0x06000000, 0x18000),
+    ("oam", 0x07000000, 0x400),
+    ("rom", 0x08000000, 0x10000),
+)
+
+HEAP_BASE = 0x10000000 # addresses given to python buffers
+IO_BASE = 0x04000000
+VRAM_BASE = 0x06000000
+VRAM_END = 0x06018000
+REG_VCOUNT = 0x04000006
+REG_KEYINPUT = 0x04000130
+REG_TM0D = 0x04000100
+REG_DMA0SAD = 0x040000b0
+DMA_CHANNEL_REG_SIZE = 12
+
+DMA_ENABLE = 1 << 31
+DMA_TIMING_SHIFT = 28
+DMA_IMMEDIATE = 0
+DMA_VBLANK = 1
+DMA_HBLANK = 2
+
+
+class Counters():
+    """ work done by the simulated hardware, see `snapshot` / `reset` """
+    FIELDS = ("frames", "reg_reads", "reg_writes", "mem_writes", "bios_calls", "dma_transfers", "bytes_moved")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        for name in self.FIELDS:
+            setattr(self, name, 0)
+
+    def snapshot(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+counters = Counters()
+_buffers = {}
+_bases = []
+for _name, _base, _size in REGIONS:
+    _buffers[_name] = ctypes.create_string_buffer(_size)
+    _bases.append((_base, _base + _size, ctypes.addressof(_buffers[_name])))
+
+# python buffers: sorted host pointers, and (host, size, address, owner) for each
+_heap_hosts = []
+_heap = []
+_heap_next = HEAP_BASE
+
+_key_input = 0x03FF # all released
+_timer_start = {} # timer -> perf_counter when enabled
+_vblank_dma = [] # channels armed for vblank
+_hblank_dma = [] # channels armed for hblank (repeat)
+vblank_hooks = []
+
+
+def reset():
+    """ clear memory, counters and the hardware state """
+    global _key_input
+    for name, base, size in REGIONS:
+        ctypes.memset(_buffers[name], 0, size)
+    counters.reset()
+    _key_input = 0x03FF
+    _timer_start.clear()
+    _vblank_dma.clear()
+    _hblank_dma.clear()
+
+
+def region_buffer(name: str):
+    return _buffers[name]
+
+
+def address_of(owner, host: int, size: int) -> int:
+    """ 32-bit address of host memory: inside the GBA regions, or mapped above HEAP_BASE """
+    global _heap_next
+    for base, end, region_host in _bases:
+        if region_host <= host < region_host + end - base:
+            return base + host - region_host
+    i = bisect.bisect_right(_heap_hosts, host) - 1
+    if i >= 0:
+        entry_host, entry_size, entry_addr, _ = _heap[i]
+        if host + size <= entry_host + entry_size:
+            return entry_addr + host - entry_host
+    addr = _heap_next
+    _heap_next += (size + 0x1F) & ~0x0F
+    i = bisect.bisect_right(_heap_hosts, host)
+    _heap_hosts.insert(i, host)
+    _heap.insert(i, (host, size, addr, owner))
+    return addr
+
+
+def host_address(addr: int, size: int = 1) -> int:
+    """ host address of a 32-bit address """
+    if addr < HEAP_BASE:
+        for base, end, host in _bases:
+            if base <= addr and addr + size <= end:
+                return host + addr - base
+    else:
+        for entry_host, entry_size, entry_addr, _ in _heap:
+            if entry_addr <= addr and addr + size <= entry_addr + entry_size:
+                return entry_host + addr - entry_addr
+    raise ValueError("unmapped address: " + hex(addr))
+
+
+def is_io(addr: int) -> bool:
+    return IO_BASE <= addr < IO_BASE + 0x400
+
+
+def is_vram(addr: int) -> bool:
+    return VRAM_BASE <= addr < VRAM_END
+
+
+_CTYPES = {1: ctypes.c_uint8, 2: ctypes.c_uint16, 4: ctypes.c_uint32}
+
+
+def raw_read(addr: int, size: int) -> int:
+    return _CTYPES[size].from_address(host_address(addr, size)).value
+
+
+def raw_write(addr: int, size: int, value: int):
+    _CTYPES[size].from_address(host_address(addr, size)).value = value & ((1 << (size * 8)) - 1)
+
+
+def read(addr: int, size: int) -> int:
+    if is_io(addr):
+        counters.reg_reads += 1
+        return _io_read(addr, size)
+    return raw_read(addr, size)
+
+
+def write(addr: int, size: int, value: int):
+    if is_io(addr):
+        counters.reg_writes += 1
+        raw_write(addr, size, value)
+        _io_written(addr, size)
+        return
+    counters.mem_writes += 1
+    if size == 1 and is_vram(addr):
+        # vram has no byte writes, the byte lands in both halves of the halfword
+        value &= 0xFF
+        raw_write(addr & ~1, 2, value | (value << 8))
+        return
+    raw_write(addr, size, value)
+
+
+def copy(src: int, dst: int, length: int):
+    """ block copy between any two addresses, counted as moved bytes """
+    if length <= 0:
+        return
+    ctypes.memmove(host_address(dst, length), host_address(src, length), length)
+    counters.bytes_moved += length
+
+
+def raw_copy_in(dst: int, data: bytes):
+    """ write host bytes to an address, not counted """
+    ctypes.memmove(host_address(dst, len(data)), data, len(data))
+
+
+def transfer(src: int, dst: int, count: int, unit: int, src_step: int, dst_step: int):
+    """ unit by unit transfer, steps are -1 / 0 / +1 units """
+    if src_step == 1 and dst_step == 1 and not is_io(dst):
+        copy(src, dst, count * unit)
+        return
+    for _ in range(count):
+        value = raw_read(src, unit)
+        raw_write(dst, unit, value)
+        if is_io(dst):
+            _io_written(dst, unit)
+        src += src_step * unit
+        dst += dst_step * unit
+    counters.bytes_moved += count * unit
+
+
+# i/o registers
+
+def _io_read(addr: int, size: int) -> int:
+    if addr == REG_KEYINPUT:
+        return _key_input
+    if REG_TM0D <= addr < REG_TM0D + 16 and (addr - REG_TM0D) % 4 == 0:
+        return _timer_count((addr - REG_TM0D) // 4)
+    return raw_read(addr, size)
+
+
+def _io_written(addr: int, size: int):
+    for channel in range(4):
+        cnt = REG_DMA0SAD + channel * DMA_CHANNEL_REG_SIZE + 8
+        # CNT_L (count) and CNT_H (control) as one word, or the CNT_H halfword alone
+        if addr == cnt or (addr == cnt + 2 and size == 2):
+            _dma_control_written(channel)
+            return
+    if REG_TM0D + 2 <= addr < REG_TM0D + 16 and (addr - REG_TM0D) % 4 == 2:
+        timer = (addr - REG_TM0D) // 4
+        if raw_read(addr, 2) & 0x80:
+            _timer_start.setdefault(timer, time.perf_counter())
+        else:
+            _timer_start.pop(timer, None)
+
+
+def _timer_count(timer: int) -> int:
+    """ timers count host time at cpu speed, a cascaded timer counts the overflows of the one before """
+    cascade = timer > 0 and raw_read(REG_TM0D + timer * 4 + 2, 2) & 0x04
+    base = timer - 1 if cascade else timer
+    if base not in _timer_start:
+        return 0
+    cycles = int((time.perf_counter() - _timer_start[base]) * CPU_FREQ)
+    return ((cycles >> 16) if cascade else cycles) & 0xFFFF
+
+
+def set_keys(pressed_mask: int):
+    """ simulate the pressed keys (KEY_* masks) """
+    global _key_input
+    _key_input = ~pressed_mask & 0x03FF
+
+
+# dma
+
+def _dma_control_written(channel: int):
+    reg = REG_DMA0SAD + channel * DMA_CHANNEL_REG_SIZE
+    control = raw_read(reg + 8, 4)
+    for armed in (_vblank_dma, _hblank_dma):
+        if channel in armed:
+            armed.remove(channel)
+    if not control & DMA_ENABLE:
+        return
+    timing = (control >> DMA_TIMING_SHIFT) & 0b11
+    if timing == DMA_IMMEDIATE:
+        run_dma(channel)
+    elif timing == DMA_VBLANK:
+        _vblank_dma.append(channel)
+    elif timing == DMA_HBLANK:
+        _hblank_dma.append(channel)
+
+
+def run_dma(channel: int, dst_override: int = None):
+    reg = REG_DMA0SAD + channel * DMA_CHANNEL_REG_SIZE
+    src = raw_read(reg, 4)
+    dst = raw_read(reg + 4, 4) if dst_override is None else dst_override
+    control = raw_read(reg + 8, 4)
+    count = control & 0xFFFF
+    if count == 0:
+        count = 0x10000 if channel == 3 else 0x4000
+    unit = 4 if control & (1 << 26) else 2
+    steps = (1, -1, 0, 1)
+    dst_step = steps[(control >> 21) & 0b11]
+    src_step = steps[(control >> 23) & 0b11]
+    transfer(src, dst, count, unit, src_step, dst_step)
+    counters.dma_transfers += 1
+    if src_step:
+        raw_write(reg, 4, src + src_step * unit * count)
+    if not control & (1 << 25):
+        # not repeating, the channel turns itself off
+        raw_write(reg + 8, 4, control & ~DMA_ENABLE)
+    return src
+
+
+def vblank():
+    """ end of a simulated frame: run the frame's hblank dma, then the vblank dma and hooks """
+    counters.frames += 1
+    for channel in list(_hblank_dma):
+        reg = REG_DMA0SAD + channel * DMA_CHANNEL_REG_SIZE
+        dst = raw_read(reg + 4, 4)
+        for _ in range(160):
+            run_dma(channel, dst)
+    raw_write(REG_VCOUNT, 2, 160)
+    for channel in list(_vblank_dma):
+        run_dma(channel)
+        reg = REG_DMA0SAD + channel * DMA_CHANNEL_REG_SIZE
+        if not raw_read(reg + 8, 4) & (1 << 25):
+            _vblank_dma.remove(channel)
+    for hook in vblank_hooks:
+        hook()
@@ -0,0 +1,18 @@
+""" host stand-in of micropython's machine module, memory access goes to gba_host """
+import gba_host
+
+
+class _Mem():
+    def __init__(self, size: int):
+        self._size = size
+
+    def __getitem__(self, addr: int) -> int:
+        return gba_host.read(addr, self._size)
+
+    def __setitem__(self, addr: int, value: int):
+        gba_host.write(addr, self._size, value)
+
+
+mem8 = _Mem(1)
+mem16 = _Mem(2)
+mem32 = _Mem(4)
@@ -0,0 +1,134 @@
+""" host stand-in of micropython's uctypes module, the subset used by lib/ """
+import ctypes
+import gba_host
+
+LITTLE_ENDIAN = 0
+BIG_ENDIAN = 1
+NATIVE = 2
+
+# descriptor layout (self consistent, not micropython's bit layout):
+# offset in bits 0-16, bitfield position in 17-21, bitfield length in 22-26, value type in 27-30
+BF_POS = 17
+BF_LEN = 22
+_TYPE_SHIFT = 27
+UINT8, INT8, UINT16, INT16, UINT32, INT32, UINT64, INT64 = (t << _TYPE_SHIFT for t in range(8))
+BFUINT8, BFINT8, BFUINT16, BFINT16, BFUINT32, BFINT32 = (t << _TYPE_SHIFT for t in range(8, 14))
+# aggregate flags, in the first item of a (flags | offset, count | type) tuple
+PTR = 1 << 30
+ARRAY = 2 << 30
+
+_OFFSET_MASK = (1 << 17) - 1
+_SIZES = (1, 1, 2, 2, 4, 4, 8, 8, 1, 1, 2, 2, 4, 4)
+_SIGNED = (False, True, False, True, False, True, False, True, False, True, False, True, False, True)
+_CTYPES = {
+    (1, False): ctypes.c_uint8, (1, True): ctypes.c_int8,
+    (2, False): ctypes.c_uint16, (2, True): ctypes.c_int16,
+    (4, False): ctypes.c_uint32, (4, True): ctypes.c_int32,
+    (8, False): ctypes.c_uint64, (8, True): ctypes.c_int64,
+}
+
+
+def addressof(obj) -> int:
+    """ 32-bit address of a buffer object, see gba_host.address_of """
+    if isinstance(obj, bytes):
+        return gba_host.address_of(obj, ctypes.cast(ctypes.c_char_p(obj), ctypes.c_void_p).value, len(obj))
+    if isinstance(obj, ctypes.Array):
+        return gba_host.address_of(obj, ctypes.addressof(obj), ctypes.sizeof(obj))
+    view = memoryview(obj)
+    if view.nbytes == 0:
+        return 0
+    if view.readonly:
+        raise TypeError("read-only buffer")
+    return gba_host.address_of(obj, ctypes.addressof(ctypes.c_char.from_buffer(view)), view.nbytes)
+
+
+def bytearray_at(addr: int, size: int):
+    """ writable bytes view of memory """
+    return memoryview((ctypes.c_char * size).from_address(gba_host.host_address(addr, size))).cast("B")
+
+
+def _type_of(desc: int) -> int:
+    return (desc >> _TYPE_SHIFT) & 0b1111
+
+
+def _field_size(desc) -> int:
+    if isinstance(desc, tuple):
+        return (desc[1] & _OFFSET_MASK) * _SIZES[_type_of(desc[1])]
+    return _SIZES[_type_of(desc)]
+
+
+def sizeof(layout: dict, layout_type: int = NATIVE) -> int:
+    size = 0
+    for desc in layout.values():
+        offset = (desc[0] if isinstance(desc, tuple) else desc) & _OFFSET_MASK
+        size = max(size, offset + _field_size(desc))
+    return size
+
+
+def _ctype(type_index: int):
+    return _CTYPES[(_SIZES[type_index], _SIGNED[type_index])]
+
+
+class _Array():
+    def __init__(self, addr: int, count: int, type_index: int):
+        self._addr = addr
+        self._count = count
+        self._ctype = _ctype(type_index)
+        self._size = _SIZES[type_index]
+
+    def __len__(self):
+        return self._count
+
+    def _host(self, index: int) -> int:
+        if index < 0 or index >= self._count:
+            raise IndexError()
+        return gba_host.host_address(self._addr + index * self._size, self._size)
+
+    def __getitem__(self, index: int) -> int:
+        return self._ctype.from_address(self._host(index)).value
+
+    def __setitem__(self, index: int, value: int):
+        self._ctype.from_address(self._host(index)).value = value
+
+
+class struct():
+    def __init__(self, addr: int, layout: dict, layout_type: int = NATIVE):
+        object.__setattr__(self, "_addr", addr)
+        object.__setattr__(self, "_layout", layout)
+
+    def _field(self, name):
+        try:
+            return self._layout[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getattr__(self, name):
+        desc = self._field(name)
+        if isinstance(desc, tuple):
+            return _Array(self._addr + (desc[0] & _OFFSET_MASK), desc[1] & _OFFSET_MASK, _type_of(desc[1]))
+        type_index = _type_of(desc)
+        host = gba_host.host_address(self._addr + (desc & _OFFSET_MASK), _SIZES[type_index])
+        value = _ctype(type_index).from_address(host).value
+        if type_index >= 8:
+            # bitfield
+            pos = (desc >> BF_POS) & 0b11111
+            length = (desc >> BF_LEN) & 0b11111
+            value = (value >> pos) & ((1 << length) - 1)
+            if _SIGNED[type_index] and value >> (length - 1):
+                value -= 1 << length
+        return value
+
+    def __setattr__(self, name, value):
+        desc = self._field(name)
+        if isinstance(desc, tuple):
+            raise TypeError("can't assign an array")
+        type_index = _type_of(desc)
+        size = _SIZES[type_index]
+        target = _CTYPES[(size, False)].from_address(
+            gba_host.host_address(self._addr + (desc & _OFFSET_MASK), size))
+        if type_index >= 8:
+            pos = (desc >> BF_POS) & 0b11111
+            mask = ((1 << ((desc >> BF_LEN) & 0b11111)) - 1) << pos
+            target.value = (target.value & ~mask) | ((value << pos) & mask)
+        else:
+            target.value = value & ((1 << (size * 8)) - 1)
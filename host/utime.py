@@ -0,0 +1,18 @@
+""" host stand-in of micropython's utime module """
+import time
+
+
+def ticks_ms() -> int:
+    return int(time.perf_counter() * 1000)
+
+
+def ticks_us() -> int:
+    return int(time.perf_counter() * 1000000)
+
+
+def ticks_diff(end: int, start: int) -> int:
+    return end - start
+
+
+def sleep_ms(ms: int):
+    time.sleep(ms / 1000)
@@ -0,0 +1,173 @@
+from array import array
+from gba_bios import bg_affine_set, HAS_BG_AFFINE_SET
+from gba_dma import dma_copy
+from uctypes import addressof
+
+REG_BG2PA = 0x04000020 # s16 PA, PB, PC, PD, s32 X, Y, then the same for BG3
+REG_BG3PA = 0x04000030
+BG_AFFINE_SIZE = 16 # bytes of one background's registers
+AFFINE_ONE = 0x100 # 1.0 in 8.8 fixed point
+
+ANGLE_STEPS = 256 # angles are 0-255 for one turn
+
+# 8.8 fixed point sin of 0 to 90 degrees
+_QUARTER_SIN = (
+    0, 6, 13, 19, 25, 31, 38, 44, 50, 56, 62, 68, 74, 80, 86, 92,
+    98, 104, 109, 115, 121, 126, 132, 137, 142, 147, 152, 157, 162, 167, 172, 177,
+    181, 185, 190, 194, 198, 202, 206, 209, 213, 216, 220, 223, 226, 229, 231, 234,
+    237, 239, 241, 243, 245, 247, 248, 250, 251, 252, 253, 254, 255, 255, 256, 256,
+    256,
+)
+SIN_LUT = array("h", [0] * ANGLE_STEPS)
+for _i in range(64):
+    SIN_LUT[_i] = _QUARTER_SIN[_i]
+    SIN_LUT[64 + _i] = _QUARTER_SIN[64 - _i]
+    SIN_LUT[128 + _i] = -_QUARTER_SIN[_i]
+    SIN_LUT[192 + _i] = -_QUARTER_SIN[64 - _i]
+
+
+def lut_sin(angle: int) -> int:
+    return SIN_LUT[angle & 0xFF]
+
+
+def lut_cos(angle: int) -> int:
+    return SIN_LUT[(angle + 64) & 0xFF]
+
+
+# shadows of both backgrounds
+# BgAffineSource: s32 tex_x, tex_y (8.8), s16 scr_x, scr_y, s16 scale_x, scale_y (8.8), u16 angle, pad
+_source = array("H", [0, 0, 0, 0, 0, 0, AFFINE_ONE, AFFINE_ONE, 0, 0] * 2)
+# registers of BG2 then BG3, contiguous: PA, PB, PC, PD, X lo, X hi, Y lo, Y hi
+_shadow = array("H", [AFFINE_ONE, 0, 0, AFFINE_ONE, 0, 0, 0, 0] * 2)
+_backgrounds = [None, None]
+_modified = 0 # bit per slot (BG2, BG3): parameters changed since `compute`
+_uncommitted = 0 # bit per slot: computed since `commit`
+
+
+class AffineBackground():
+    """ rotation and scale of BG2 or BG3 (affine in modes 1 and 2)
+
+        the texture point (tex_x, tex_y) is shown at the screen point (scr_x, scr_y),
+        rotated by angle (0-255 per turn) and scaled by scale_x / scale_y (8.8, 0x100 is 1:1,
+        bigger zooms out). setters only write the shadow, `compute` turns the changed shadows
+        into registers values with one BIOS call, `commit` copies the registers of the changed
+        backgrounds in vblank, a background without an AffineBackground is never written.
+    """
+
+    def __init__(self, bg: int = 2):
+        if bg != 2 and bg != 3:
+            raise ValueError("affine backgrounds are BG2 and BG3.")
+        self.bg = bg
+        self._slot = bg - 2
+        self.tex_x = 0
+        self.tex_y = 0
+        self.scr_x = 0
+        self.scr_y = 0
+        self.scale_x = AFFINE_ONE
+        self.scale_y = AFFINE_ONE
+        self.angle = 0
+        _backgrounds[self._slot] = self
+        self._changed()
+
+    def _changed(self):
+        global _modified
+        _modified |= 1 << self._slot
+        src = _source
+        i = self._slot * 10
+        tex_x = self.tex_x << 8
+        tex_y = self.tex_y << 8
+        src[i] = tex_x & 0xFFFF
+        src[i + 1] = (tex_x >> 16) & 0xFFFF
+        src[i + 2] = tex_y & 0xFFFF
+        src[i + 3] = (tex_y >> 16) & 0xFFFF
+        src[i + 4] = self.scr_x & 0xFFFF
+        src[i + 5] = self.scr_y & 0xFFFF
+        src[i + 6] = self.scale_x & 0xFFFF
+        src[i + 7] = self.scale_y & 0xFFFF
+        src[i + 8] = (self.angle & 0xFF) << 8
+
+    def set_center(self, tex_x: int, tex_y: int, scr_x: int = 120, scr_y: int = 80):
+        """ show the texture pixel (tex_x, tex_y) at the screen pixel (scr_x, scr_y) """
+        self.tex_x = tex_x
+        self.tex_y = tex_y
+        self.scr_x = scr_x
+        self.scr_y = scr_y
+        self._changed()
+
+    def set_rotation(self, angle: int):
+        self.angle = angle & 0xFF
+        self._changed()
+
+    def set_scale(self, scale_x: int, scale_y: int = None):
+        self.scale_x = scale_x
+        self.scale_y = scale_x if scale_y is None else scale_y
+        self._changed()
+
+    def set(self, tex_x: int, tex_y: int, angle: int, scale_x: int, scale_y: int = None,
+            scr_x: int = 120, scr_y: int = 80):
+        """ every parameter at once """
+        self.tex_x = tex_x
+        self.tex_y = tex_y
+        self.scr_x = scr_x
+        self.scr_y = scr_y
+        self.angle = angle & 0xFF
+        self.scale_x = scale_x
+        self.scale_y = scale_x if scale_y is None else scale_y
+        self._changed()
+
+    def _compute_lut(self):
+        # same result as BgAffineSet, from the 8.8 tables
+        sin = SIN_LUT[self.angle]
+        cos = SIN_LUT[(self.angle + 64) & 0xFF]
+        pa = (cos * self.scale_x) >> 8
+        pb = -(sin * self.scale_x) >> 8
+        pc = (sin * self.scale_y) >> 8
+        pd = (cos * self.scale_y) >> 8
+        dx = (self.tex_x << 8) - (pa * self.scr_x + pb * self.scr_y)
+        dy = (self.tex_y << 8) - (pc * self.scr_x + pd * self.scr_y)
+        dst = _shadow
+        i = self._slot * 8
+        dst[i] = pa & 0xFFFF
+        dst[i + 1] = pb & 0xFFFF
+        dst[i + 2] = pc & 0xFFFF
+        dst[i + 3] = pd & 0xFFFF
+        dst[i + 4] = dx & 0xFFFF
+        dst[i + 5] = (dx >> 16) & 0xFFFF
+        dst[i + 6] = dy & 0xFFFF
+        dst[i + 7] = (dy >> 16) & 0xFFFF
+
+
+def compute() -> bool:
+    """ turn the changed parameters into register values, call in the render phase,
+        return False when nothing changed
+    """
+    global _modified, _uncommitted
+    changed = _modified
+    if not changed:
+        return False
+    _modified = 0
+    _uncommitted |= changed
+    if HAS_BG_AFFINE_SET:
+        # the changed slots in one call
+        first = 0 if changed & 1 else 1
+        count = 2 if changed == 3 else 1
+        bg_affine_set(addressof(_source) + first * 20, addressof(_shadow) + first * BG_AFFINE_SIZE, count)
+    else:
+        for slot in range(2):
+            if changed & (1 << slot):
+                _backgrounds[slot]._compute_lut()
+    return True
+
+
+def commit():
+    """ copy the registers (16 bytes per background) of the computed backgrounds in one transfer,
+        call right after vblank
+    """
+    global _uncommitted
+    slots = _uncommitted
+    if not slots:
+        return
+    _uncommitted = 0
+    first = 0 if slots & 1 else 1
+    size = BG_AFFINE_SIZE * 2 if slots == 3 else BG_AFFINE_SIZE
+    dma_copy(addressof(_shadow) + first * BG_AFFINE_SIZE, REG_BG2PA + first * BG_AFFINE_SIZE, size)
@@ -1,4 +1,6 @@
 from gba import BIOS # type: ignore
+from machine import mem32
+from array import array
 from uctypes import addressof
 
 CSET_DST_INC     = (0<<21)
@@ -15,6 +17,9 @@ CSET_REPEAT      = (1<<25)
 CSET_16          = (0<<26)
 CSET_32          = (1<<26)
 
+# source word of the fixed-source fill
+_fill_word = array("I", [0])
+
 def vblank_intr_wait():
     BIOS.vblank_intr_wait()
 
@@ -34,3 +39,84 @@ def cpu_set_fast(source, destination, length_in_byte):
         destination,
         CSET_32 | CSET_SRC_INC | CSET_DST_INC | repeat_count,
     )
+
+
+def cpu_fill_fast(destination, value: int, length_in_byte):
+    """
+        fill with a 32-bit value, the smallest block size is 32 bytes (8 words)
+    """
+    if not isinstance(destination, int):
+        destination = addressof(destination)
+    repeat_count = length_in_byte // 4
+    if repeat_count >= 2 ** 16:
+        raise ValueError("data length is too long.")
+    _fill_word[0] = value & 0xFFFFFFFF
+    BIOS.cpu_set_fast(
+        addressof(_fill_word),
+        destination,
+        CSET_32 | CSET_SRC_FIXED | CSET_DST_INC | repeat_count,
+    )
+
+
+# BgAffineSet (swi 0x0E) is only there when the firmware binds it
+HAS_BG_AFFINE_SET = hasattr(BIOS, "bg_affine_set")
+
+def bg_affine_set(source, destination, count: int) -> bool:
+    """
+        compute count background matrices + offsets (16 bytes each) from
+        count BgAffineSource structs (20 bytes each), False without the binding
+    """
+    if not HAS_BG_AFFINE_SET:
+        return False
+    if not isinstance(source, int):
+        source = addressof(source)
+    if not isinstance(destination, int):
+        destination = addressof(destination)
+    BIOS.bg_affine_set(source, destination, count)
+    return True
+
+
+# decompression (swi 0x11-0x15), only there when the firmware binds them
+COMP_LZ77 = 0x10
+COMP_HUFF = 0x20 # | 4 or 8 bits per symbol
+COMP_RL = 0x30
+HAS_LZ77_UNCOMP = hasattr(BIOS, "lz77_uncomp_wram") and hasattr(BIOS, "lz77_uncomp_vram")
+HAS_RL_UNCOMP = hasattr(BIOS, "rl_uncomp_wram") and hasattr(BIOS, "rl_uncomp_vram")
+HAS_HUFF_UNCOMP = hasattr(BIOS, "huff_uncomp")
+
+def uncomp_header(source) -> int:
+    """ the header word of compressed data: type in bits 0-7, uncompressed size in bits 8-31 """
+    if isinstance(source, int):
+        return mem32[source]
+    return source[0] | (source[1] << 8) | (source[2] << 16) | (source[3] << 24)
+
+def uncomp(source, destination, vram: bool = False) -> int:
+    """
+        decompress BIOS LZ77 / RL / Huffman data (see tools/gba_compress.py), return the size.
+        vram uses the halfword writing routines, needed when destination is vram;
+        the source must be word aligned, a misaligned bytes constant is copied first
+    """
+    header = uncomp_header(source)
+    kind = header & 0xF0
+    if not isinstance(source, int):
+        if addressof(source) & 3:
+            source = bytearray(source)
+        source = addressof(source)
+    if not isinstance(destination, int):
+        destination = addressof(destination)
+    if kind == COMP_LZ77 and HAS_LZ77_UNCOMP:
+        if vram:
+            BIOS.lz77_uncomp_vram(source, destination)
+        else:
+            BIOS.lz77_uncomp_wram(source, destination)
+    elif kind == COMP_RL and HAS_RL_UNCOMP:
+        if vram:
+            BIOS.rl_uncomp_vram(source, destination)
+        else:
+            BIOS.rl_uncomp_wram(source, destination)
+    elif kind == COMP_HUFF and HAS_HUFF_UNCOMP:
+        # writes words, fine for vram too
+        BIOS.huff_uncomp(source, destination)
+    else:
+        raise ValueError("no BIOS decompression for this data.")
+    return header >> 8
@@ -0,0 +1,37 @@
+import gc
+import sys
+from utime import ticks_us, ticks_diff
+from gba_mem import mem_alloc
+
+# (module name, us, heap bytes) of every timed import, in import order
+report = []
+
+
+def timed_import(name: str):
+    """ import a module and record the time and heap it took, a module imported before costs nothing
+
+        the heap is the growth of gc.mem_alloc() after a collection. modules it loads for the
+        first time are counted under its name, e.g. gba_video also loads gba_dma, and gba_reg /
+        gba_bios when they were not imported yet (gba_mem is loaded by gba_boot itself)
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    gc.collect()
+    heap = mem_alloc()
+    start = ticks_us()
+    module = __import__(name)
+    elapsed = ticks_diff(ticks_us(), start)
+    gc.collect()
+    report.append((name, elapsed, mem_alloc() - heap))
+    return module
+
+
+def print_report(print_fn=print):
+    total_us = 0
+    total_heap = 0
+    for name, us, heap in report:
+        print_fn("{}: {} us, {} bytes".format(name, us, heap))
+        total_us += us
+        total_heap += heap
+    print_fn("boot: {} us, {} bytes".format(total_us, total_heap))
@@ -1,4 +1,5 @@
-from machine import mem32
+from machine import mem16, mem32
+from array import array
 from uctypes import addressof
 from gba import BIOS # type: ignore
 
@@ -45,6 +46,11 @@ IRQ_DMA1        = (1<<9)
 IRQ_DMA2        = (1<<10)
 IRQ_DMA3        = (1<<11)
 
+DMA_CHANNEL_REG_SIZE = 12 # SAD, DAD, CNT of one channel
+
+# source word of the fixed-source fill
+_fill_word = array("I", [0])
+
 def dma3_copy_by_word(source, destination, length_in_byte):
     if not isinstance(source, int):
         source = addressof(source)
@@ -59,3 +65,207 @@ def dma3_copy_by_word(source, destination, length_in_byte):
     # When you activate DMA the so-called DMA controller takes over the hardware
     # (the CPU is actually halted)
     # so there is no need to wait, function will return once the operation end.
+
+
+def dma_copy(source, destination, length_in_byte, width: int = 32, channel: int = 3, timing: int = DMA_IMMEDIATE):
+    """ start a dma transfer on the channel, width is 16 or 32 (bits per unit)
+
+        with DMA_IMMEDIATE the function returns once the transfer ended,
+        with DMA_VBLANK / DMA_HBLANK the channel is armed and starts at that timing.
+        channel 0 can not read from cartridge rom.
+    """
+    if not isinstance(source, int):
+        source = addressof(source)
+    if not isinstance(destination, int):
+        destination = addressof(destination)
+    if width == 32:
+        repeat_count = length_in_byte // 4
+        control = DMA32
+    else:
+        repeat_count = length_in_byte // 2
+        control = DMA16
+    if repeat_count >= (2 ** 16 if channel == 3 else 2 ** 14):
+        raise ValueError("DMA length is too long.")
+    reg = REG_DMA0SAD + channel * DMA_CHANNEL_REG_SIZE
+    mem32[reg] = source
+    mem32[reg + 4] = destination
+    mem32[reg + 8] = repeat_count | DMA_DST_INC | DMA_SRC_INC | control | timing | DMA_ENABLE
+
+
+def dma_fill(destination, value: int, length_in_byte, width: int = 32, channel: int = 3):
+    """ fill with a 16-bit or 32-bit value, using a fixed-source transfer """
+    if not isinstance(destination, int):
+        destination = addressof(destination)
+    if width == 32:
+        _fill_word[0] = value & 0xFFFFFFFF
+        repeat_count = length_in_byte // 4
+        control = DMA32
+    else:
+        _fill_word[0] = (value & 0xFFFF) | ((value & 0xFFFF) << 16)
+        repeat_count = length_in_byte // 2
+        control = DMA16
+    if repeat_count <= 0:
+        return
+    if repeat_count >= (2 ** 16 if channel == 3 else 2 ** 14):
+        raise ValueError("DMA length is too long.")
+    reg = REG_DMA0SAD + channel * DMA_CHANNEL_REG_SIZE
+    mem32[reg] = addressof(_fill_word)
+    mem32[reg + 4] = destination
+    mem32[reg + 8] = repeat_count | DMA_DST_INC | DMA_SRC_FIXED | control | DMA_IMMEDIATE | DMA_ENABLE
+
+
+def dma_stop(channel: int):
+    """ disable the channel, cancel an armed or repeating transfer """
+    mem32[REG_DMA0SAD + channel * DMA_CHANNEL_REG_SIZE + 8] = 0
+
+
+class DMAQueue():
+    """ transfers queued during the frame, then run back to back by `flush`
+
+        call `flush` right after vblank_intr_wait, so the uploads land in VBlank.
+        byte_budget limits the bytes moved by one flush (0 means no limit),
+        the rest of the queue is kept for the next frame.
+        sources are stored as addresses, keep the buffers alive until flushed.
+    """
+
+    def __init__(self, capacity: int = 32, channel: int = 3, byte_budget: int = 0):
+        self.channel = channel
+        self.byte_budget = byte_budget
+        self._src = array("L", [0] * capacity)
+        self._dst = array("L", [0] * capacity)
+        self._length = array("L", [0] * capacity)
+        self._width = bytearray(capacity)
+        self._head = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+    def enqueue(self, source, destination, length_in_byte: int, width: int = 32):
+        if length_in_byte <= 0:
+            return
+        capacity = len(self._width)
+        if self._count >= capacity:
+            raise ValueError("DMA queue is full.")
+        if not isinstance(source, int):
+            source = addressof(source)
+        if not isinstance(destination, int):
+            destination = addressof(destination)
+        i = (self._head + self._count) % capacity
+        self._src[i] = source
+        self._dst[i] = destination
+        self._length[i] = length_in_byte
+        self._width[i] = width
+        self._count += 1
+
+    def flush(self) -> int:
+        """ run the queued transfers, return the number of bytes moved """
+        capacity = len(self._width)
+        budget = self.byte_budget
+        moved = 0
+        while self._count > 0:
+            i = self._head
+            length = self._length[i]
+            width = self._width[i]
+            if budget > 0 and moved + length > budget:
+                # split the transfer, the rest carries over to the next frame
+                unit = 4 if width == 32 else 2
+                part = (budget - moved) // unit * unit
+                if part <= 0:
+                    break
+                dma_copy(self._src[i], self._dst[i], part, width, self.channel)
+                self._src[i] += part
+                self._dst[i] += part
+                self._length[i] = length - part
+                moved += part
+                break
+            dma_copy(self._src[i], self._dst[i], length, width, self.channel)
+            moved += length
+            self._head = (i + 1) % capacity
+            self._count -= 1
+        if self._count == 0:
+            self._head = 0
+        return moved
+
+
+SCANLINES = 160
+
+
+class ScanlineEffect():
+    """ one register value per scanline, written by an hblank repeat dma
+
+        the table has 161 rows of `units` values (16 or 32 bits each): row n is written to
+        destination (e.g. REG_BG1HOFS 0x04000014, or REG_BG2X 0x04000028 with 2 units of 32 bits
+        for the affine reference point) for line n. the dma writes row n+1 in the hblank after
+        line n, row 0 is written by `vblank`, row 160 lands in vblank and is not shown.
+        draw in `table` (the back buffer, halfwords), call `present` to show it from the next
+        frame, and call `vblank` right after every vblank_intr_wait to restart the dma.
+    """
+
+    def __init__(self, destination: int, units: int = 1, width: int = 16, channel: int = 0):
+        """ channel 0 has the highest priority and leaves channel 3 to the uploads """
+        self.destination = destination
+        self.units = units
+        self.width = width
+        self.channel = channel
+        self.row_halfwords = units * (2 if width == 32 else 1)
+        size = self.row_halfwords * (SCANLINES + 1)
+        self._tables = (array("H", [0] * size), array("H", [0] * size))
+        self._front = 0
+        self._pending = False
+        self._running = False
+        self._control = (units | DMA_DST_RELOAD | DMA_SRC_INC | DMA_REPEAT | DMA_HBLANK
+                         | (DMA32 if width == 32 else DMA16) | DMA_ENABLE)
+
+    @property
+    def table(self) -> array:
+        """ back buffer, row n starts at n * row_halfwords """
+        return self._tables[1 - self._front]
+
+    def set_line(self, line: int, value: int, unit: int = 0):
+        """ set one value of a row of the back buffer, 32-bit values are split in halfwords """
+        table = self._tables[1 - self._front]
+        if self.width == 32:
+            i = line * self.row_halfwords + unit * 2
+            table[i] = value & 0xFFFF
+            table[i + 1] = (value >> 16) & 0xFFFF
+        else:
+            table[line * self.row_halfwords + unit] = value & 0xFFFF
+
+    def fill(self, value: int, unit: int = 0):
+        """ the same value on every line """
+        for line in range(SCANLINES + 1):
+            self.set_line(line, value, unit)
+
+    def present(self):
+        """ show the back buffer from the next vblank on, the back buffer then starts as a copy of it """
+        self._pending = True
+        self._running = True
+
+    def vblank(self):
+        """ write row 0 and restart the dma, call right after vblank_intr_wait """
+        if not self._running:
+            return
+        if self._pending:
+            self._pending = False
+            self._front = 1 - self._front
+            front = self._tables[self._front]
+            dma_copy(front, self._tables[1 - self._front], len(front) * 2, 16)
+        front = self._tables[self._front]
+        reg = REG_DMA0SAD + self.channel * DMA_CHANNEL_REG_SIZE
+        mem32[reg + 8] = 0
+        dst = self.destination
+        for i in range(self.row_halfwords):
+            mem16[dst + i * 2] = front[i]
+        mem32[reg] = addressof(front) + self.row_halfwords * 2
+        mem32[reg + 4] = dst
+        mem32[reg + 8] = self._control
+
+    def stop(self):
+        """ stop the dma, the register keeps the last written value """
+        self._running = False
+        dma_stop(self.channel)
@@ -0,0 +1,158 @@
+from array import array
+from utime import ticks_ms, ticks_diff
+from gba_bios import vblank_intr_wait
+from gba_timer import CycleCounter, CYCLES_PER_FRAME, cycles_diff, cycles_to_us
+from gba_mem import GCPolicy
+
+FRAME_US = 16743 # 280896 cycles at 16.78 MHz
+
+PHASE_COMMIT = 0
+PHASE_UPDATE = 1
+PHASE_RENDER = 2
+PHASE_NAMES = ("commit", "update", "render")
+
+
+def _nothing():
+    pass
+
+
+def _same(t: int) -> int:
+    return t
+
+
+class FrameScheduler():
+    """ fixed timestep main loop
+
+        every frame: wait for vblank, run the commit hook (register / vram uploads) right away,
+        then the update hook (game logic) and the render hook (draw into shadow buffers).
+        when the work overruns the frame, the missed vblanks are counted and the lost frames are
+        caught up with update-only frames, at most max_catch_up per frame.
+        phase times are in ms, or in cycles when a started `gba_timer.CycleCounter` is given.
+        with a `gba_mem.GCPolicy` as memory, the frame's allocations are counted and garbage
+        is collected in the time left after the render hook.
+    """
+
+    def __init__(self, target_hz: int = 60, max_catch_up: int = 2, counter: CycleCounter = None,
+                 memory: GCPolicy = None):
+        """ target_hz is 60, 30, 20, 15 ... (60 / vblanks per frame) """
+        if target_hz <= 0 or 60 % target_hz:
+            raise ValueError("target rate must divide 60.")
+        self.interval = 60 // target_hz # vblanks per frame
+        self.max_catch_up = max_catch_up
+        self._commit = _nothing
+        self._update = _nothing
+        self._render = _nothing
+        self._running = False
+        self._wait = 1 # vblanks to wait before the next frame
+        self._catch_up = 0
+        self.memory = memory
+        if counter is None:
+            self.time_unit = "ms"
+            self._clock = ticks_ms
+            self._clock_diff = ticks_diff
+            self._frame_time = FRAME_US
+            self._time_scale = 1000 # ms to us
+            self._to_us = _same
+        else:
+            self.time_unit = "cycles"
+            self._clock = counter.read
+            self._clock_diff = cycles_diff
+            self._frame_time = CYCLES_PER_FRAME
+            self._time_scale = 1
+            self._to_us = cycles_to_us
+        # counters
+        self.frame_count = 0
+        self.missed_vblanks = 0
+        self.late_frames = 0 # frames whose work overran
+        self.catch_up_frames = 0
+        self.phase_time = array("L", [0, 0, 0]) # last frame
+        # since the last take_totals, 32-bit: take them every few seconds (cycles pass 2**30 in a minute)
+        self.phase_total_time = array("L", [0, 0, 0])
+        self.total_frames = 0
+
+    def on_commit(self, fn):
+        """ fn() runs right after vblank, keep it to register writes and vram copies """
+        self._commit = fn
+
+    def on_update(self, fn):
+        self._update = fn
+
+    def on_render(self, fn):
+        self._render = fn
+
+    def reset_counters(self):
+        self.frame_count = 0
+        self.missed_vblanks = 0
+        self.late_frames = 0
+        self.catch_up_frames = 0
+        self.total_frames = 0
+        for i in range(3):
+            self.phase_time[i] = 0
+            self.phase_total_time[i] = 0
+
+    def take_totals(self, out: array) -> int:
+        """ copy the phase totals into out (3 items) and restart them, return the frames they cover """
+        totals = self.phase_total_time
+        for i in range(3):
+            out[i] = totals[i]
+            totals[i] = 0
+        frames = self.total_frames
+        self.total_frames = 0
+        return frames
+
+    def step(self):
+        """ run one frame """
+        for _ in range(self._wait):
+            vblank_intr_wait()
+        clock = self._clock
+        diff = self._clock_diff
+        memory = self.memory
+        if memory is not None:
+            memory.alloc.begin()
+        t0 = clock()
+        self._commit()
+        t1 = clock()
+        while self._catch_up > 0:
+            self._update()
+            self._catch_up -= 1
+            self.catch_up_frames += 1
+        self._update()
+        t2 = clock()
+        self._render()
+        t3 = clock()
+        t4 = t3
+        if memory is not None:
+            memory.alloc.end()
+            # time left before the frame's last vblank
+            slack = self.interval * self._frame_time - diff(t3, t0) * self._time_scale
+            if memory.idle(self._to_us(slack) if slack > 0 else 0):
+                # the collection may run into the next vblank
+                t4 = clock()
+        # account
+        phase_time = self.phase_time
+        phase_time[PHASE_COMMIT] = diff(t1, t0)
+        phase_time[PHASE_UPDATE] = diff(t2, t1)
+        phase_time[PHASE_RENDER] = diff(t3, t2)
+        for i in range(3):
+            self.phase_total_time[i] += phase_time[i]
+        self.total_frames += 1
+        self.frame_count += 1
+        # vblanks passed while working
+        spent = diff(t4, t0) * self._time_scale // self._frame_time
+        if spent >= self.interval:
+            missed = spent - self.interval + 1
+            self.missed_vblanks += missed
+            self.late_frames += 1
+            self._catch_up = min((missed + self.interval - 1) // self.interval, self.max_catch_up)
+            self._wait = 1
+        else:
+            self._wait = self.interval - spent
+
+    def run(self):
+        """ run frames until `stop` is called from a hook """
+        self._running = True
+        while self._running:
+            self.step()
+
+    def stop(self):
+        self._running = False
@@ -1,4 +1,5 @@
 from machine import mem16
+from array import array
 from gba import BIOS # type: ignore
 
 REG_KEYINPUT        = 0x04000130 # u16
@@ -37,6 +38,20 @@ KEY_MASK_NAME_MAP = {
 
 last_status = 0b0000_0000_0000_0000 # default all key up
 
+# frame snapshot, updated by poll()
+key_held = 0
+key_pressed = 0
+key_released = 0
+key_repeated = 0 # pressed this frame, or auto-repeated while held
+repeat_delay = 20 # frames before the first repeat, 0 disables auto-repeat
+repeat_interval = 4 # frames between repeats
+_repeat_timer = 0
+
+# optional event ring buffer, see enable_event_buffer()
+_events = None
+_event_head = 0
+_event_count = 0
+
 def is_keydown(key_mask: int) -> bool:
     # print(bin(mem16[REG_KEYINPUT] | 0b10000000_00000000))
     return ((~mem16[REG_KEYINPUT]) & key_mask & KEY_MASK_ALL) > 0
@@ -71,9 +86,103 @@ def key_mask_to_name(key_mask: int) -> str:
         return KEY_MASK_NAME_MAP[key_mask]
     return ""
 
-def wait_until_keydown(key_mask: int, when_any = True) -> bool:
-    key_mask = key_mask & KEY_MASK_ALL
-    key_mask = key_mask | (1 << 14)
+def wait_until_keydown(key_mask: int, when_any = True) -> int:
+    """ halt until the keys are down, return the keys of the mask that are down
+
+        the poll() snapshot is left alone, the next poll() sees the press
+    """
+    keys = key_mask & KEY_MASK_ALL
+    key_mask = keys | (1 << 14)
     key_mask = key_mask | ((0 if when_any else 1) << 15)
     mem16[REG_KEYCNT] = key_mask
     BIOS.intr_wait(0, IRQ_KEYPAD)
+    return ~(mem16[REG_KEYINPUT]) & keys
+
+
+def poll() -> int:
+    """ read the keys once for this frame, update key_held / key_pressed / key_released / key_repeated
+
+        call it once per frame, returns key_held
+    """
+    global key_held, key_pressed, key_released, key_repeated, _repeat_timer
+    current: int = ~(mem16[REG_KEYINPUT]) & KEY_MASK_ALL
+    changed = current ^ key_held
+    key_pressed = changed & current
+    key_released = changed & key_held
+    key_held = current
+    if key_pressed:
+        key_repeated = key_pressed
+        _repeat_timer = repeat_delay
+    elif current and repeat_delay > 0:
+        _repeat_timer -= 1
+        if _repeat_timer <= 0:
+            key_repeated = current
+            _repeat_timer = repeat_interval
+        else:
+            key_repeated = 0
+    else:
+        key_repeated = 0
+    if changed and _events is not None:
+        if key_pressed:
+            _push_event(EVENT_KEYDOWN | key_pressed)
+        if key_released:
+            _push_event(EVENT_KEYUP | key_released)
+    return current
+
+
+def set_key_repeat(delay: int, interval: int):
+    """ auto-repeat timing in frames, delay 0 disables it """
+    global repeat_delay, repeat_interval
+    repeat_delay = delay
+    repeat_interval = max(interval, 1)
+
+
+def is_held(key_mask: int) -> bool:
+    return (key_held & key_mask) > 0
+
+
+def is_pressed(key_mask: int) -> bool:
+    return (key_pressed & key_mask) > 0
+
+
+def is_released(key_mask: int) -> bool:
+    return (key_released & key_mask) > 0
+
+
+def is_repeated(key_mask: int) -> bool:
+    return (key_repeated & key_mask) > 0
+
+
+def enable_event_buffer(size: int = 16):
+    """ keep the key changes seen by poll() in a ring buffer,
+        events are EVENT_KEYDOWN / EVENT_KEYUP | key masks, size 0 disables the buffer
+
+        only poll() fills it, so it holds the same changes as key_pressed / key_released,
+        seen at poll time; it keeps them in order until read_event() drains them
+    """
+    global _events, _event_head, _event_count
+    _events = array("I", [0] * size) if size > 0 else None
+    _event_head = 0
+    _event_count = 0
+
+
+def _push_event(event: int):
+    global _event_head, _event_count
+    size = len(_events)
+    _events[(_event_head + _event_count) % size] = event
+    if _event_count < size:
+        _event_count += 1
+    else:
+        # full, drop the oldest
+        _event_head = (_event_head + 1) % size
+
+
+def read_event() -> int:
+    """ pop the oldest buffered event, EVENT_NONE if there is none """
+    global _event_head, _event_count
+    if not _event_count:
+        return EVENT_NONE | key_held
+    event = _events[_event_head]
+    _event_head = (_event_head + 1) % len(_events)
+    _event_count -= 1
+    return event
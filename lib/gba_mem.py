@@ -0,0 +1,162 @@
+import gc
+from utime import ticks_us, ticks_diff
+
+# gc.mem_alloc / gc.mem_free are micropython only
+_mem_alloc = getattr(gc, "mem_alloc", None)
+_mem_free = getattr(gc, "mem_free", None)
+_threshold = getattr(gc, "threshold", None) # needs MICROPY_GC_ALLOC_THRESHOLD
+
+
+def mem_alloc() -> int:
+    """ heap bytes in use, 0 when gc can not tell """
+    return _mem_alloc() if _mem_alloc else 0
+
+
+def mem_free() -> int:
+    """ free heap bytes, -1 when gc can not tell """
+    return _mem_free() if _mem_free else -1
+
+
+class AllocCounter():
+    """ heap bytes allocated per frame, from gc.mem_alloc() deltas """
+
+    def __init__(self):
+        self.last = 0 # last frame
+        self.peak = 0
+        self.total = 0
+        self.frames = 0
+        self._start = 0
+
+    def begin(self):
+        self._start = mem_alloc()
+
+    def end(self) -> int:
+        """ bytes allocated since `begin` """
+        n = mem_alloc() - self._start
+        if n < 0:
+            # a collection ran inside the frame
+            n = 0
+        self.last = n
+        if n > self.peak:
+            self.peak = n
+        self.total += n
+        self.frames += 1
+        return n
+
+    def reset(self):
+        self.last = 0
+        self.peak = 0
+        self.total = 0
+        self.frames = 0
+
+
+class GCPolicy():
+    """ collect in the idle time after the frame's work
+
+        `idle` is called with the time left before the next vblank (gba_frame.FrameScheduler
+        does it after the render hook). it collects when collect_after bytes were allocated
+        since the last collection and the slack covers the last measured collection time.
+        below min_free free bytes it collects anyway, counted in `forced`.
+        gc stays enabled, so an allocation that finds no memory still collects first;
+        gc.threshold (when the port has it) is raised to auto_after bytes, a backstop well
+        above collect_after, so the automatic collection rarely runs in the middle of a frame.
+    """
+
+    def __init__(self, collect_after: int = 16384, min_free: int = 4096, margin_us: int = 500,
+                 auto_after: int = 65536):
+        self.collect_after = collect_after
+        self.min_free = min_free
+        self.margin_us = margin_us
+        self.collect_us = 4000 # estimate until the first collection is measured
+        self.collections = 0
+        self.forced = 0
+        self.deferred = 0 # frames with garbage due but not enough slack
+        self.alloc = AllocCounter()
+        self._base = mem_alloc()
+        gc.enable()
+        if _threshold:
+            _threshold(max(auto_after, collect_after))
+
+    def release(self):
+        """ give collection back to gc """
+        if _threshold:
+            _threshold(-1)
+
+    def pending(self) -> int:
+        """ bytes allocated since the last collection """
+        return mem_alloc() - self._base
+
+    def idle(self, slack_us: int) -> bool:
+        """ collect if due and there is time, return True if it collected """
+        free = mem_free()
+        if 0 <= free < self.min_free:
+            self.forced += 1
+        elif self.pending() < self.collect_after:
+            return False
+        elif slack_us < self.collect_us + self.margin_us:
+            self.deferred += 1
+            return False
+        self.collect()
+        return True
+
+    def collect(self):
+        start = ticks_us()
+        gc.collect()
+        self.collect_us = ticks_diff(ticks_us(), start)
+        self.collections += 1
+        self._base = mem_alloc()
+
+
+class ScratchPool():
+    """ bytearrays reused instead of allocated, `take` one, `give` it back
+
+        take returns the smallest free buffer of at least size bytes, when there is none
+        a new one is allocated and kept in the pool (counted in `allocations`),
+        so after the first frames nothing is allocated. `reserve` preallocates.
+    """
+
+    def __init__(self):
+        self._buffers = [] # sorted by size
+        self._used = bytearray()
+        self.allocations = 0
+
+    def reserve(self, size: int, count: int = 1):
+        for _ in range(count):
+            self._add(bytearray(size))
+
+    def _add(self, buffer: bytearray) -> int:
+        i = 0
+        while i < len(self._buffers) and len(self._buffers[i]) <= len(buffer):
+            i += 1
+        self._buffers.insert(i, buffer)
+        used = self._used
+        self._used = used[:i] + b"\x00" + used[i:]
+        return i
+
+    def take(self, size: int) -> bytearray:
+        """ a buffer of at least size bytes, its content is left over from its last use """
+        buffers = self._buffers
+        used = self._used
+        for i in range(len(buffers)):
+            if not used[i] and len(buffers[i]) >= size:
+                used[i] = 1
+                return buffers[i]
+        self.allocations += 1
+        i = self._add(bytearray(size))
+        self._used[i] = 1
+        return self._buffers[i]
+
+    def give(self, buffer: bytearray):
+        buffers = self._buffers
+        for i in range(len(buffers)):
+            if buffers[i] is buffer:
+                self._used[i] = 0
+                return
+        raise ValueError("buffer not from this pool.")
+
+    def in_use(self) -> int:
+        return sum(self._used)
+
+
+# shared by gba_video (scratch tiles, bands) and gba_text
+scratch = ScratchPool()
@@ -0,0 +1,142 @@
+from array import array
+from uctypes import addressof
+from gba_dma import dma_copy
+from gba_video import REG_BG_PALETTE, upload, upload_blob
+
+PALETTE_COLOR_COUNT = 256
+PALETTE_SIZE = PALETTE_COLOR_COUNT * 2 # u16 each
+PALETTE_BANK_COUNT = 16
+PALETTE_BANK_SIZE = 16 * 2 # 16 colors, u16 each
+
+
+class PaletteManager():
+    """ shadow of a whole 256 colors palette, uploaded by block copies """
+
+    def __init__(self, palette_addr: int = REG_BG_PALETTE):
+        """ palette_addr is REG_BG_PALETTE or REG_SPRITE_PALETTE """
+        self.palette_addr = palette_addr
+        self.colors = array("H", bytes(PALETTE_SIZE))
+        self._view = memoryview(self.colors)
+
+    def get_color(self, index: int) -> int:
+        return self.colors[index]
+
+    def set_color(self, index: int, color555: int):
+        self.colors[index] = color555 & 0xFFFF
+
+    def set_colors(self, start: int, colors):
+        """ copy color555 values from start, an array('H') is copied by one slice """
+        if isinstance(colors, array):
+            self._view[start: start + len(colors)] = memoryview(colors)
+            return
+        for i in range(len(colors)):
+            self.colors[start + i] = colors[i] & 0xFFFF
+
+    def load_data(self, data, start: int = 0):
+        """ copy packed color555 values (e.g. NAME_PALETTE of gba_assets) into the shadow from color start """
+        upload_blob(data, addressof(self.colors) + start * 2, min(len(data), PALETTE_SIZE - start * 2))
+
+    def update_all(self, queue=None):
+        upload(self.colors, self.palette_addr, PALETTE_SIZE, queue)
+
+    def update_range(self, start: int, count: int, queue=None):
+        """ upload some colors, the range is widened to whole 16 colors blocks of the shadow """
+        first = start & ~0x0F
+        last = (start + count + 0x0F) & ~0x0F
+        upload(addressof(self.colors) + first * 2, self.palette_addr + first * 2, (last - first) * 2, queue)
+
+
+class PaletteBankManager(PaletteManager):
+    """ the 16 banks of 16 colors used by 4bpp tiles, the bank of a tile is
+        selected by the palette_bank of its screen entry
+    """
+
+    def __init__(self, palette_addr: int = REG_BG_PALETTE):
+        """ palette_addr is REG_BG_PALETTE or REG_SPRITE_PALETTE """
+        super().__init__(palette_addr)
+        self._used = 0 # bit mask of the allocated banks
+
+    def allocate(self) -> int:
+        """ reserve a free bank and return it """
+        for bank in range(PALETTE_BANK_COUNT):
+            if not self._used & (1 << bank):
+                self._used |= 1 << bank
+                return bank
+        raise ValueError("no free palette bank.")
+
+    def free(self, bank: int):
+        self._used &= ~(1 << bank)
+
+    def set_bank_color(self, bank: int, index: int, color555: int):
+        self.colors[bank * 16 + (index & 0x0F)] = color555 & 0xFFFF
+
+    def set_bank(self, bank: int, colors):
+        """ set all the colors of a bank, colors is a sequence of up to 16 color555 values """
+        self.set_colors(bank * 16, colors[:16])
+
+    def update_bank(self, bank: int, queue=None):
+        """ upload one bank (32 bytes) """
+        self.update_range(bank * 16, 16, queue)
+
+
+class PaletteAnimation():
+    """ precomputed frames of a color range, `step` shows the next frame with one copy
+
+        the frame is written to the palette shadow too, so full uploads keep it
+    """
+
+    def __init__(self, palette: PaletteManager, start: int, count: int, frames: array):
+        """ frames holds frame_count * count color555 values, frame after frame """
+        self.palette = palette
+        self.start = start
+        self.count = count
+        self.frames = frames
+        self._view = memoryview(frames)
+        self.frame_count = len(frames) // count
+        self.frame = 0
+
+    def step(self, queue=None):
+        count = self.count
+        offset = self.frame * count
+        palette = self.palette
+        palette._view[self.start: self.start + count] = self._view[offset: offset + count]
+        src = addressof(self.frames) + offset * 2
+        dst = palette.palette_addr + self.start * 2
+        if queue is None:
+            dma_copy(src, dst, count * 2, 16)
+        else:
+            queue.enqueue(src, dst, count * 2, 16)
+        self.frame += 1
+        if self.frame >= self.frame_count:
+            self.frame = 0
+
+
+def cycle_animation(palette: PaletteManager, start: int, count: int) -> PaletteAnimation:
+    """ rotate the colors of the range by one entry per frame """
+    frames = array("H", bytes(count * count * 2))
+    colors = palette.colors
+    for f in range(count):
+        for i in range(count):
+            frames[f * count + i] = colors[start + (i + f) % count]
+    return PaletteAnimation(palette, start, count, frames)
+
+
+def fade_animation(palette: PaletteManager, start: int, count: int, target555: int = 0, steps: int = 16) -> PaletteAnimation:
+    """ fade the colors of the range to target555 in steps frames, the last frame is the target """
+    frames = array("H", bytes(steps * count * 2))
+    colors = palette.colors
+    tr = target555 & 0x1F
+    tg = (target555 >> 5) & 0x1F
+    tb = (target555 >> 10) & 0x1F
+    for f in range(steps):
+        k = f + 1
+        for i in range(count):
+            c = colors[start + i]
+            r = c & 0x1F
+            g = (c >> 5) & 0x1F
+            b = (c >> 10) & 0x1F
+            r += (tr - r) * k // steps
+            g += (tg - g) * k // steps
+            b += (tb - b) * k // steps
+            frames[f * count + i] = r | (g << 5) | (b << 10)
+    return PaletteAnimation(palette, start, count, frames)
@@ -0,0 +1,106 @@
+from array import array
+from gba_timer import CycleCounter, CYCLE_MASK, cycles_to_us
+
+
+class _Scope():
+    # preallocated context manager of one section, `with` does not allocate
+    def __init__(self, profiler, section: int):
+        self._profiler = profiler
+        self._section = section
+
+    def __enter__(self):
+        self._profiler.begin(self._section)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profiler.end(self._section)
+        return False
+
+
+class Profiler():
+    """ call counts and cycle totals of named sections, kept in preallocated arrays
+
+        section ids come from `section`, measure with begin/end, `with profiler.scope(id)`,
+        the `profile` decorator, or `instrument` on an existing function / method.
+        totals are 32-bit, report and reset them every few seconds (see `tick`).
+    """
+
+    def __init__(self, counter: CycleCounter, capacity: int = 16):
+        self.counter = counter
+        self.names = []
+        self.calls = array("L", [0] * capacity)
+        self.cycles = array("L", [0] * capacity)
+        self._start = array("L", [0] * capacity)
+        self._scopes = []
+        self._read = counter.read
+        self._frames = 0
+
+    def section(self, name: str) -> int:
+        """ id of the named section, created on first use """
+        if name in self.names:
+            return self.names.index(name)
+        if len(self.names) >= len(self.calls):
+            raise ValueError("too many profiler sections.")
+        self.names.append(name)
+        self._scopes.append(_Scope(self, len(self.names) - 1))
+        return len(self.names) - 1
+
+    def begin(self, section: int):
+        self._start[section] = self._read()
+
+    def end(self, section: int):
+        elapsed = (self._read() - self._start[section]) & CYCLE_MASK
+        self.calls[section] += 1
+        self.cycles[section] += elapsed
+
+    def scope(self, section: int) -> _Scope:
+        return self._scopes[section]
+
+    def wrap(self, section: int, fn):
+        """ return fn measured as the section """
+        begin = self.begin
+        end = self.end
+
+        def wrapper(*args, **kwargs):
+            begin(section)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                end(section)
+        return wrapper
+
+    def profile(self, name: str):
+        """ decorator, measure every call of the function as the named section """
+        section = self.section(name)
+
+        def decorator(fn):
+            return self.wrap(section, fn)
+        return decorator
+
+    def instrument(self, owner, attr: str, name: str = None):
+        """ replace owner.attr (a module function or a class method) by a measured version,
+            e.g. instrument(gba_reg.IndirectVisitedRegister, "apply")
+        """
+        fn = getattr(owner, attr)
+        setattr(owner, attr, self.wrap(self.section(name or attr), fn))
+        return fn
+
+    def reset(self):
+        for i in range(len(self.calls)):
+            self.calls[i] = 0
+            self.cycles[i] = 0
+
+    def report(self, print_fn=print):
+        for i in range(len(self.names)):
+            calls = self.calls[i]
+            cycles = self.cycles[i]
+            print_fn("{}: {} calls, {} cycles, {} us/call".format(
+                self.names[i], calls, cycles, cycles_to_us(cycles // calls) if calls else 0))
+
+    def tick(self, every: int = 60, print_fn=print):
+        """ call once per frame, report and reset every `every` frames """
+        self._frames += 1
+        if self._frames >= every:
+            self._frames = 0
+            self.report(print_fn)
+            self.reset()
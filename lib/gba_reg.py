@@ -1,5 +1,10 @@
 import uctypes as ut
+from array import array
 from machine import mem16, mem32
+from gba_bios import vblank_intr_wait
+
+# every register shadow, in creation order, see `commit`
+_registers = []
 
 
 class IndirectVisitedRegister():
@@ -7,75 +12,127 @@ class IndirectVisitedRegister():
         # by pass modified version of __setattr__
         super().__setattr__("_is_32bit", is_32bit)
         super().__setattr__("_addr", addr)
-        super().__setattr__("_buf", bytearray(ut.sizeof(layout, layout_type)))
+        # shadow is kept as register sized words, so apply/load are one store per word
+        size = ut.sizeof(layout, layout_type)
+        if is_32bit:
+            buf = array("I", [0] * ((size + 3) // 4))
+        else:
+            buf = array("H", [0] * ((size + 1) // 2))
+        super().__setattr__("_buf", buf)
         super().__setattr__("_reg", ut.struct(ut.addressof(self._buf), layout, layout_type))
+        super().__setattr__("_dirty", False)
+        _registers.append(self)
 
     def __TYPING_HINT__(self):
         self._is_32bit: bool
+        self._dirty: bool
         self._addr: int
-        self._buf: bytearray
+        self._buf: array
         self._reg: any
 
     def __getattr__(self, name):
         return getattr(self._reg, name)
 
     def __setattr__(self, name, value):
+        super().__setattr__("_dirty", True)
         return setattr(self._reg, name, value)
 
+    @property
+    def dirty(self) -> bool:
+        """ shadow changed since the last apply/load """
+        return self._dirty
+
     def write_by_halfword(self):
-        for offset in range(len(self._buf)):
-            if offset % 2:
-                continue
-            # print("Writing halfword to:", hex(self._addr + offset), bin((self._buf[offset]) | (self._buf[offset + 1] << 8) | 0b1_0000_0000_0000_0000))
-            mem16[
-                self._addr + offset
-            ] = (self._buf[offset]) | (self._buf[offset + 1] << 8)
+        addr = self._addr
+        if self._is_32bit:
+            for val in self._buf:
+                mem16[addr] = val & 0xFFFF
+                mem16[addr + 2] = val >> 16
+                addr += 4
+        else:
+            for val in self._buf:
+                mem16[addr] = val
+                addr += 2
 
     def write_by_word(self):
-        for offset in range(len(self._buf)):
-            if offset % 4:
-                continue
-            # print("Writing word to:", hex(self._addr + offset))
-            mem32[self._addr + offset] = (
-                (self._buf[offset])
-                | (self._buf[offset + 1] << 8)
-                | (self._buf[offset + 2] << 16)
-                | (self._buf[offset + 3] << 24)
-            )
+        addr = self._addr
+        if self._is_32bit:
+            for val in self._buf:
+                mem32[addr] = val
+                addr += 4
+        else:
+            buf = self._buf
+            for i in range(0, len(buf), 2):
+                mem32[addr] = buf[i] | (buf[i + 1] << 16)
+                addr += 4
 
     def read_by_halfword(self):
-        for offset in range(len(self._buf)):
-            if offset % 2:
-                continue
-            val = mem16[self._addr + offset]
-            self._buf[offset] = val & 0xFF
-            self._buf[offset + 1] = (val >> 8) & 0xFF
+        addr = self._addr
+        buf = self._buf
+        if self._is_32bit:
+            for i in range(len(buf)):
+                buf[i] = mem16[addr] | (mem16[addr + 2] << 16)
+                addr += 4
+        else:
+            for i in range(len(buf)):
+                buf[i] = mem16[addr]
+                addr += 2
 
     def read_by_word(self):
-        for offset in range(len(self._buf)):
-            if offset % 4:
-                continue
-            val = mem32[self._addr + offset]
-            self._buf[offset] = val & 0xFF
-            self._buf[offset + 1] = (val >> 8) & 0xFF
-            self._buf[offset + 2] = (val >> 16) & 0xFF
-            self._buf[offset + 3] = (val >> 24) & 0xFF
+        addr = self._addr
+        buf = self._buf
+        if self._is_32bit:
+            for i in range(len(buf)):
+                buf[i] = mem32[addr]
+                addr += 4
+        else:
+            for i in range(0, len(buf), 2):
+                val = mem32[addr]
+                buf[i] = val & 0xFFFF
+                buf[i + 1] = val >> 16
+                addr += 4
 
     def apply(self):
-        if self._is_32bit:
+        super().__setattr__("_dirty", False)
+        buf = self._buf
+        if len(buf) == 1:
+            # most registers are one word
+            if self._is_32bit:
+                mem32[self._addr] = buf[0]
+            else:
+                mem16[self._addr] = buf[0]
+        elif self._is_32bit:
             self.write_by_word()
         else:
             self.write_by_halfword()
 
     def load(self):
+        super().__setattr__("_dirty", False)
         if self._is_32bit:
             self.read_by_word()
         else:
             self.read_by_halfword()
 
     def reset(self):
-        for i in range(len(self._buf)):
-            self._buf[i] = 0x00
+        super().__setattr__("_dirty", True)
+        buf = self._buf
+        for i in range(len(buf)):
+            buf[i] = 0
+
+
+def commit(wait_vblank: bool = False) -> int:
+    """ apply every dirty register in one pass, return the number of registers written
+
+        with wait_vblank, wait for the next VBlank first, so all the writes land in the same blank
+    """
+    if wait_vblank:
+        vblank_intr_wait()
+    count = 0
+    for reg in _registers:
+        if reg._dirty:
+            reg.apply()
+            count += 1
+    return count
 
 
 REG_DISPCNT_LAYOUT = {
@@ -109,8 +166,6 @@ REG_DISPCNT_LAYOUT = {
     "WIN1": (0 | ut.BFUINT16 | 14 << ut.BF_POS | 1 << ut.BF_LEN),
     "WINOBJ": (0 | ut.BFUINT16 | 15 << ut.BF_POS | 1 << ut.BF_LEN),
 }
-REG_DISPCNT = IndirectVisitedRegister(
-    0x04000000, REG_DISPCNT_LAYOUT, ut.NATIVE, False)
 
 """
 Table 9.4a: regular bg sizes 
@@ -143,14 +198,6 @@ REG_BGCNT_LAYOUT = {
     # Background Size. Regular and affine backgrounds have different sizes available to them.
     "SIZE": (0 | ut.BFUINT16 | 14 << ut.BF_POS | 2 << ut.BF_LEN),
 }
-REG_BG0CNT = IndirectVisitedRegister(
-    0x04000008, REG_BGCNT_LAYOUT, ut.NATIVE, False)
-REG_BG1CNT = IndirectVisitedRegister(
-    0x0400000a, REG_BGCNT_LAYOUT, ut.NATIVE, False)
-REG_BG2CNT = IndirectVisitedRegister(
-    0x0400000c, REG_BGCNT_LAYOUT, ut.NATIVE, False)
-REG_BG3CNT = IndirectVisitedRegister(
-    0x0400000e, REG_BGCNT_LAYOUT, ut.NATIVE, False)
 
 """
 Each background has two 16-bit scrolling registers to offset the rendering (REG_BGxHOFS and REG_BGxVOFS).
@@ -159,15 +206,31 @@ First, because regular backgrounds wrap around, the values are essentially modul
 This is not really relevant at the moment, but you can use this to your benefit once you get to more advanced tilemaps.
 Second, these registers are write-only! It means that you can’t update the position by simply doing REG_BG0HOFS++ and the like.
 """
+# HOFS and VOFS are written together by one 32-bit store
 REG_BGOFS_LAYOUT = {
     "HOFS": (0x00 | ut.INT16),
     "VOFS": (0x02 | ut.INT16),
 }
-REG_BG0OFS = IndirectVisitedRegister(
-    0x04000010, REG_BGOFS_LAYOUT, ut.NATIVE, False)
-REG_BG1OFS = IndirectVisitedRegister(
-    0x04000014, REG_BGOFS_LAYOUT, ut.NATIVE, False)
-REG_BG2OFS = IndirectVisitedRegister(
-    0x04000018, REG_BGOFS_LAYOUT, ut.NATIVE, False)
-REG_BG3OFS = IndirectVisitedRegister(
-    0x0400001c, REG_BGOFS_LAYOUT, ut.NATIVE, False)
+
+# shadows are built on first access (see __getattr__), name: (address, layout, is_32bit)
+_REGISTER_SPECS = {
+    "REG_DISPCNT": (0x04000000, REG_DISPCNT_LAYOUT, False),
+    "REG_BG0CNT": (0x04000008, REG_BGCNT_LAYOUT, False),
+    "REG_BG1CNT": (0x0400000a, REG_BGCNT_LAYOUT, False),
+    "REG_BG2CNT": (0x0400000c, REG_BGCNT_LAYOUT, False),
+    "REG_BG3CNT": (0x0400000e, REG_BGCNT_LAYOUT, False),
+    "REG_BG0OFS": (0x04000010, REG_BGOFS_LAYOUT, True),
+    "REG_BG1OFS": (0x04000014, REG_BGOFS_LAYOUT, True),
+    "REG_BG2OFS": (0x04000018, REG_BGOFS_LAYOUT, True),
+    "REG_BG3OFS": (0x0400001c, REG_BGOFS_LAYOUT, True),
+}
+
+
+def __getattr__(name: str):
+    """ create a register shadow the first time it is used, then it is a plain module global """
+    spec = _REGISTER_SPECS.get(name)
+    if spec is None:
+        raise AttributeError(name)
+    reg = IndirectVisitedRegister(spec[0], spec[1], ut.NATIVE, spec[2])
+    globals()[name] = reg
+    return reg
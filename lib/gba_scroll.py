@@ -0,0 +1,119 @@
+from array import array
+import gba_reg
+from gba_video import BGMap
+
+VIEW_TILE_W = 31 # 240 pixels, plus one column partly shown while scrolling
+VIEW_TILE_H = 21 # 160 pixels, plus one row
+
+
+class WorldScroller():
+    """ scroll a regular background over a world map of any size
+
+        the world is an array('H') of screen entries, row by row (world_w * world_h).
+        the hardware map (32 or 64 tiles each way) is used as a ring buffer: world tile (x, y)
+        lives in map cell (x % map_w, y % map_h), so a scroll step writes only the newly exposed
+        columns / rows of the view, O(view edge) whatever the world size.
+        call `scroll_to` in the update / render phase and `commit` right after vblank.
+    """
+
+    def __init__(self, bg_map: BGMap, world: array, world_w: int, world_h: int, bg: int = 0):
+        """ bg is the background (0-3) whose BGxOFS is set """
+        if bg_map.byte_per_entry != 2:
+            raise ValueError("scrolling needs a regular background map.")
+        if world_w < VIEW_TILE_W or world_h < VIEW_TILE_H or len(world) < world_w * world_h:
+            raise ValueError("world is smaller than the screen.")
+        self.bg_map = bg_map
+        self.world = world
+        self.world_w = world_w
+        self.world_h = world_h
+        self.ofs = getattr(gba_reg, "REG_BG{}OFS".format(bg))
+        self._world_view = memoryview(world)
+        self._column = array("H", [0] * VIEW_TILE_H)
+        self._column_view = memoryview(self._column)
+        self.x = 0 # camera, world pixels
+        self.y = 0
+        self._tile_x = -1 # view origin in tiles, -1 before the first draw
+        self._tile_y = -1
+
+    def _write_row(self, world_x: int, world_y: int, count: int):
+        # one world row segment, split where it wraps around the map
+        bg_map = self.bg_map
+        map_w = bg_map.tile_w
+        src = self._world_view
+        i = world_y * self.world_w + world_x
+        map_x = world_x % map_w
+        map_y = world_y % bg_map.tile_h
+        first = min(count, map_w - map_x)
+        bg_map.blit_row(map_x, map_y, src[i: i + first])
+        if count > first:
+            bg_map.blit_row(0, map_y, src[i + first: i + count])
+
+    def _write_column(self, world_x: int, world_y: int, count: int):
+        bg_map = self.bg_map
+        map_h = bg_map.tile_h
+        column = self._column
+        world = self.world
+        world_w = self.world_w
+        i = world_y * world_w + world_x
+        for n in range(count):
+            column[n] = world[i]
+            i += world_w
+        map_x = world_x % bg_map.tile_w
+        map_y = world_y % map_h
+        first = min(count, map_h - map_y)
+        view = self._column_view
+        bg_map.blit_column(map_x, map_y, view[0: first])
+        if count > first:
+            bg_map.blit_column(map_x, 0, view[first: count])
+
+    def redraw(self):
+        """ write the whole view, after a jump or a world change """
+        self._draw_rows(self._tile_y, VIEW_TILE_H)
+
+    def _draw_rows(self, world_y: int, count: int):
+        w = min(VIEW_TILE_W, self.world_w - self._tile_x)
+        for y in range(world_y, min(world_y + count, self.world_h)):
+            self._write_row(self._tile_x, y, w)
+
+    def scroll_to(self, x: int, y: int):
+        """ move the camera (top left, world pixels, clamped to the world) and write the exposed tiles """
+        x = max(0, min(x, self.world_w * 8 - 240))
+        y = max(0, min(y, self.world_h * 8 - 160))
+        self.x = x
+        self.y = y
+        tile_x = x >> 3
+        tile_y = y >> 3
+        old_x = self._tile_x
+        old_y = self._tile_y
+        self._tile_x = tile_x
+        self._tile_y = tile_y
+        if old_x < 0 or abs(tile_x - old_x) >= VIEW_TILE_W or abs(tile_y - old_y) >= VIEW_TILE_H:
+            self.redraw()
+        else:
+            # new columns, over the rows of the new view
+            h = min(VIEW_TILE_H, self.world_h - tile_y)
+            if tile_x > old_x:
+                first = max(old_x + VIEW_TILE_W, tile_x)
+                last = min(tile_x + VIEW_TILE_W, self.world_w)
+            else:
+                first = tile_x
+                last = old_x
+            for col in range(first, last):
+                self._write_column(col, tile_y, h)
+            # new rows, over the columns of the new view
+            if tile_y > old_y:
+                self._draw_rows(max(old_y + VIEW_TILE_H, tile_y), tile_y - old_y)
+            elif tile_y < old_y:
+                self._draw_rows(tile_y, old_y - tile_y)
+        ofs = self.ofs
+        ofs.HOFS = x & (self.bg_map.tile_w * 8 - 1)
+        ofs.VOFS = y & (self.bg_map.tile_h * 8 - 1)
+
+    def scroll_by(self, dx: int, dy: int):
+        self.scroll_to(self.x + dx, self.y + dy)
+
+    def commit(self, queue=None):
+        """ upload the written map lines and the offsets, call right after vblank """
+        self.bg_map.flush(queue)
+        if self.ofs.dirty:
+            self.ofs.apply()
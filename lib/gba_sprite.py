@@ -0,0 +1,98 @@
+from array import array
+from gba_video import upload
+
+OAM_ADDR = 0x07000000
+OAM_ENTRY_COUNT = 128
+OAM_SIZE = OAM_ENTRY_COUNT * 8 # attr0, attr1, attr2 and the affine filler, u16 each
+
+# attr0
+ATTR0_Y_MASK = 0x00FF
+ATTR0_MODE_MASK = (0b11 << 8)
+ATTR0_HIDE = (0b10 << 8)
+ATTR0_8BPP = (1 << 13)
+# attr1
+ATTR1_X_MASK = 0x01FF
+ATTR1_HFLIP = (1 << 12)
+ATTR1_VFLIP = (1 << 13)
+
+"""
+Sprite sizes (shape, size) -> pixels
+shape \\ size     0       1       2       3
+0 (square)      8x8     16x16   32x32   64x64
+1 (wide)        16x8    32x8    32x16   64x32
+2 (tall)        8x16    8x32    16x32   32x64
+"""
+SHAPE_SQUARE = 0
+SHAPE_WIDE = 1
+SHAPE_TALL = 2
+
+
+class SpriteManager():
+    """ shadow of the whole OAM in one array('H'), sprites are slot numbers 0-127
+
+        change sprites during the frame, then call `upload` after vblank to copy the 1 KB OAM at once.
+        tile_index counts 32 bytes tiles of the sprite charblocks (4-5), 8bpp sprites use even indexes.
+    """
+
+    def __init__(self):
+        self.oam = array("H", bytes(OAM_SIZE))
+        # stack of free slots, the lowest slot on top
+        self._free = bytearray(range(OAM_ENTRY_COUNT - 1, -1, -1))
+        self._free_count = OAM_ENTRY_COUNT
+        self._allocated = bytearray(OAM_ENTRY_COUNT) # 1 per allocated slot
+        self.hide_all()
+
+    def __len__(self):
+        """ number of allocated sprites """
+        return OAM_ENTRY_COUNT - self._free_count
+
+    def alloc(self) -> int:
+        """ take a free slot, it stays hidden until `set` or `set_visible` """
+        if self._free_count <= 0:
+            raise ValueError("no free sprite.")
+        self._free_count -= 1
+        sprite = self._free[self._free_count]
+        self._allocated[sprite] = 1
+        return sprite
+
+    def free(self, sprite: int):
+        """ hide the sprite and give its slot back """
+        if not (0 <= sprite < OAM_ENTRY_COUNT and self._allocated[sprite]):
+            raise ValueError("sprite is not allocated.")
+        self._allocated[sprite] = 0
+        self.set_visible(sprite, False)
+        self._free[self._free_count] = sprite
+        self._free_count += 1
+
+    def hide_all(self):
+        oam = self.oam
+        for i in range(0, OAM_ENTRY_COUNT * 4, 4):
+            oam[i] = ATTR0_HIDE
+
+    def set(self, sprite: int, x: int, y: int, tile_index: int, shape: int = SHAPE_SQUARE, size: int = 0,
+            palette_bank: int = 0, priority: int = 0, h_flip=False, v_flip=False, bpp: int = 4):
+        """ set every attribute of a sprite and show it """
+        i = sprite * 4
+        oam = self.oam
+        oam[i] = (y & ATTR0_Y_MASK) | ((shape & 0b11) << 14) | (ATTR0_8BPP if bpp == 8 else 0)
+        oam[i + 1] = ((x & ATTR1_X_MASK) | ((size & 0b11) << 14)
+                      | (ATTR1_HFLIP if h_flip else 0) | (ATTR1_VFLIP if v_flip else 0))
+        oam[i + 2] = (tile_index & 0x03FF) | ((priority & 0b11) << 10) | ((palette_bank & 0b1111) << 12)
+
+    def set_position(self, sprite: int, x: int, y: int):
+        i = sprite * 4
+        oam = self.oam
+        oam[i] = (oam[i] & ~ATTR0_Y_MASK) | (y & ATTR0_Y_MASK)
+        oam[i + 1] = (oam[i + 1] & ~ATTR1_X_MASK) | (x & ATTR1_X_MASK)
+
+    def set_tile(self, sprite: int, tile_index: int, palette_bank: int = 0, priority: int = 0):
+        self.oam[sprite * 4 + 2] = (tile_index & 0x03FF) | ((priority & 0b11) << 10) | ((palette_bank & 0b1111) << 12)
+
+    def set_visible(self, sprite: int, visible: bool):
+        i = sprite * 4
+        attr0 = self.oam[i] & ~ATTR0_MODE_MASK
+        self.oam[i] = attr0 if visible else (attr0 | ATTR0_HIDE)
+
+    def upload(self, queue=None):
+        """ copy the whole shadow OAM, OAM is only writable in vblank (or hblank with OAM_HBL) """
+        upload(self.oam, OAM_ADDR, OAM_SIZE, queue)
@@ -0,0 +1,171 @@
+import gba_keypad
+from gba_bios import vblank_intr_wait
+
+# what a task waits for, yielded by the awaitables below: a frame count, or a flag | key mask
+WAIT_PRESS = (1 << 16)
+WAIT_RELEASE = (1 << 17)
+_KEY_WAIT = WAIT_PRESS | WAIT_RELEASE
+
+
+class Frames():
+    """ `await Frames(n)` resumes the task n frames later """
+
+    def __init__(self, count: int = 1):
+        if count < 1 or count >= WAIT_PRESS:
+            raise ValueError("frame count is out of range.")
+        self.count = count
+
+    def __await__(self):
+        yield self.count
+
+    __iter__ = __await__ # MicroPython awaits through __iter__
+
+
+class KeyPress():
+    """ `await KeyPress(mask)` resumes the task on the frame one of the keys is pressed,
+        and returns the pressed keys of the mask
+    """
+
+    def __init__(self, key_mask: int = gba_keypad.KEY_MASK_ALL):
+        self.wait = WAIT_PRESS | (key_mask & gba_keypad.KEY_MASK_ALL)
+
+    def __await__(self):
+        return (yield self.wait)
+
+    __iter__ = __await__
+
+
+class KeyRelease(KeyPress):
+    """ `await KeyRelease(mask)` resumes the task on the frame one of the keys is released """
+
+    def __init__(self, key_mask: int = gba_keypad.KEY_MASK_ALL):
+        self.wait = WAIT_RELEASE | (key_mask & gba_keypad.KEY_MASK_ALL)
+
+
+_NEXT_FRAME = Frames(1)
+
+
+def next_frame() -> Frames:
+    """ `await next_frame()`, shared, no allocation """
+    return _NEXT_FRAME
+
+
+class Task():
+    def __init__(self, coro):
+        self.coro = coro
+        self.done = False
+        self.result = None
+        self._frame = 0 # resume on this frame
+        self._wait = 0 # WAIT_PRESS / WAIT_RELEASE | key mask, 0 when waiting for a frame
+
+    def cancel(self):
+        """ the task is dropped on the next tick """
+        self.done = True
+        self.coro.close()
+
+
+class Scheduler():
+    """ cooperative tasks (async def) run once per frame
+
+        a task runs until it awaits `next_frame()`, `Frames(n)`, `KeyPress(mask)` or
+        `KeyRelease(mask)`. `run` owns the main loop: it halts the cpu in the BIOS until the next
+        vblank, or until a key interrupt when every task waits for a key press, then reads
+        the keys once (gba_keypad.poll) and resumes the tasks that are due.
+        in a loop you own (e.g. a FrameScheduler update hook), call gba_keypad.poll then `tick`.
+    """
+
+    def __init__(self):
+        # ticks run so far, a sleep on the keypad counts as one tick however long it lasts;
+        # it only happens when no task waits for a frame, so Frames(n) deadlines are not moved,
+        # but frame is not a clock
+        self.frame = 0
+        self._tasks = []
+
+    def spawn(self, coro) -> Task:
+        """ add a coroutine, it first runs on the next tick """
+        task = Task(coro)
+        self._tasks.append(task)
+        return task
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def _resume(self, task: Task, value):
+        try:
+            wait = task.coro.send(value)
+        except StopIteration as e:
+            task.done = True
+            task.result = e.value
+            return
+        if not isinstance(wait, int) or wait <= 0:
+            task.cancel()
+            raise TypeError("task {} awaited {!r}, await next_frame(), Frames, KeyPress or KeyRelease.".format(
+                task.coro, wait))
+        if wait & _KEY_WAIT:
+            task._wait = wait
+        else:
+            task._wait = 0
+            task._frame = self.frame + wait
+
+    def tick(self):
+        """ advance one frame and resume the due tasks, reads the keys of the last poll """
+        self.frame += 1
+        frame = self.frame
+        pressed = gba_keypad.key_pressed
+        released = gba_keypad.key_released
+        tasks = self._tasks
+        finished = 0
+        # tasks spawned while ticking run on the next tick
+        for i in range(len(tasks)):
+            task = tasks[i]
+            if task.done:
+                finished += 1
+                continue
+            wait = task._wait
+            if wait == 0:
+                if task._frame <= frame:
+                    self._resume(task, None)
+            elif wait & WAIT_PRESS:
+                if wait & pressed:
+                    self._resume(task, wait & pressed & gba_keypad.KEY_MASK_ALL)
+            elif wait & released:
+                self._resume(task, wait & released & gba_keypad.KEY_MASK_ALL)
+            if task.done:
+                finished += 1
+        if finished:
+            # compact in place
+            j = 0
+            for task in tasks:
+                if not task.done:
+                    tasks[j] = task
+                    j += 1
+            del tasks[j:]
+
+    def sleep(self):
+        """ halt until the next frame a task may run, then read the keys
+
+            when every task waits for a key press, it halts until the keypad interrupt, the
+            vblanks passed meanwhile are not counted in `frame`
+        """
+        key_mask = 0
+        for task in self._tasks:
+            wait = task._wait
+            if not wait & WAIT_PRESS:
+                # a frame or a release: every vblank counts
+                key_mask = 0
+                break
+            key_mask |= wait
+        key_mask &= gba_keypad.KEY_MASK_ALL
+        if key_mask and not gba_keypad.key_held & key_mask:
+            # only key presses pending, the keypad interrupt wakes the cpu
+            gba_keypad.wait_until_keydown(key_mask)
+        else:
+            vblank_intr_wait()
+        gba_keypad.poll()
+
+    def run(self):
+        """ run until every task is done """
+        while self._tasks:
+            self.sleep()
+            self.tick()
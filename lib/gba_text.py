@@ -0,0 +1,60 @@
+from gba_video import TileManager, BGMap, regular_bg_entry, scratch_tile, release_tile
+
+FONT_FIRST_CHAR = 32 # framebuf 8x8 font covers ascii 32-127
+FONT_LAST_CHAR = 127
+
+
+class FontAtlas():
+    """ the framebuf 8x8 font rendered once into a charblock, one tile per character """
+
+    def __init__(self, tile_manager: TileManager, tile_offset: int = 0, color: int = 1, background: int = 0,
+                 first_char: int = FONT_FIRST_CHAR, last_char: int = FONT_LAST_CHAR):
+        """ call tile_manager.update_all() afterwards to upload the glyphs """
+        self.tile_manager = tile_manager
+        self.tile_offset = tile_offset
+        self.first_char = first_char
+        self.last_char = last_char
+        glyph = scratch_tile(1, 1)
+        for i in range(last_char - first_char + 1):
+            glyph.fill(background)
+            glyph.text(chr(first_char + i), 0, 0, color)
+            tile_manager.set_tile_data(glyph, tile_offset + i)
+        release_tile(glyph)
+
+    def __len__(self):
+        return self.last_char - self.first_char + 1
+
+    def tile_index(self, char_code: int) -> int:
+        """ tile of the character, characters out of the atlas use the first one (space) """
+        if char_code < self.first_char or char_code > self.last_char:
+            char_code = self.first_char
+        return self.tile_offset + char_code - self.first_char
+
+
+class TextLayer():
+    """ print text on a background map by writing one screen entry per character """
+
+    def __init__(self, bg_map: BGMap, atlas: FontAtlas, palette_bank: int = 0):
+        self.bg_map = bg_map
+        self.atlas = atlas
+        if bg_map.byte_per_entry == 2:
+            self._base = regular_bg_entry(0, palette_bank=palette_bank)
+        else:
+            self._base = 0
+
+    def text(self, s: str, tile_x: int, tile_y: int):
+        """ write a string starting at the cell, only the changed cells are marked dirty """
+        bg_map = self.bg_map
+        buf = bg_map.buffer
+        atlas = self.atlas
+        base = self._base
+        x = tile_x
+        for c in s:
+            entry = base | atlas.tile_index(ord(c))
+            if buf[bg_map.entry_index(x, tile_y)] != entry:
+                bg_map.set_entry(x, tile_y, entry)
+            x += 1
+
+    def clear(self, tile_x: int, tile_y: int, tile_w: int, tile_h: int = 1):
+        """ fill the area with spaces """
+        self.bg_map.fill_rect(tile_x, tile_y, tile_w, tile_h, self._base | self.atlas.tile_index(32))
@@ -0,0 +1,74 @@
+from machine import mem16
+
+REG_TM0D        = 0x04000100 # u16, counter when read, reload value when written
+REG_TM0CNT      = 0x04000102 # u16
+REG_TM1D        = 0x04000104
+REG_TM1CNT      = 0x04000106
+REG_TM2D        = 0x04000108
+REG_TM2CNT      = 0x0400010a
+REG_TM3D        = 0x0400010c
+REG_TM3CNT      = 0x0400010e
+
+TM_REG_SIZE     = 4 # TMxD, TMxCNT of one timer
+
+TM_FREQ_1       = 0 # 16.78 MHz, one tick per cycle
+TM_FREQ_64      = 1
+TM_FREQ_256     = 2
+TM_FREQ_1024    = 3
+TM_CASCADE      = (1<<2) # count when the previous timer overflows
+TM_IRQ          = (1<<6)
+TM_ENABLE       = (1<<7)
+
+CPU_FREQ        = 16777216
+CYCLES_PER_FRAME = 280896 # 228 lines of 1232 cycles
+# cycle values are kept to 30 bits, so they stay small ints (no allocation)
+CYCLE_MASK      = 0x3FFFFFFF
+
+
+def cycles_diff(end: int, start: int) -> int:
+    """ cycles between two `CycleCounter.read` values, valid up to 64 seconds """
+    return (end - start) & CYCLE_MASK
+
+
+def cycles_to_us(cycles: int) -> int:
+    # 1000000 / 2**24 == 15625 / 2**18
+    return cycles * 15625 >> 18
+
+
+class CycleCounter():
+    """ 32-bit cycle counter, a timer counting every cycle cascaded into the next one """
+
+    def __init__(self, timer: int = 0):
+        """ uses timer and timer + 1, values: 0-2 """
+        if timer < 0 or timer > 2:
+            raise ValueError()
+        self.timer = timer
+        self._lo_data = REG_TM0D + timer * TM_REG_SIZE
+        self._hi_data = self._lo_data + TM_REG_SIZE
+
+    def start(self):
+        """ reset to 0 and start counting """
+        lo_cnt = self._lo_data + 2
+        hi_cnt = self._hi_data + 2
+        mem16[lo_cnt] = 0
+        mem16[hi_cnt] = 0
+        # reload values, loaded when the timers are enabled
+        mem16[self._lo_data] = 0
+        mem16[self._hi_data] = 0
+        mem16[hi_cnt] = TM_CASCADE | TM_ENABLE
+        mem16[lo_cnt] = TM_FREQ_1 | TM_ENABLE
+
+    def stop(self):
+        mem16[self._lo_data + 2] = 0
+        mem16[self._hi_data + 2] = 0
+
+    def read(self) -> int:
+        """ current cycle count, masked by CYCLE_MASK """
+        hi = mem16[self._hi_data]
+        lo = mem16[self._lo_data]
+        hi2 = mem16[self._hi_data]
+        if hi2 != hi:
+            # the low timer overflowed between the reads
+            lo = mem16[self._lo_data]
+            hi = hi2
+        return ((hi & 0x3FFF) << 16) | lo
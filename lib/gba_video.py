@@ -1,8 +1,12 @@
 from machine import mem16
-from framebuf import FrameBuffer, GS8
-from gba_bios import vblank_intr_wait, cpu_set_fast
-from gba_reg import IndirectVisitedRegister, REG_DISPCNT, REG_BG0CNT
-from gba_reg import REG_BG0CNT, REG_BG1CNT, REG_BG2CNT, REG_BG3CNT
+from array import array
+from uctypes import addressof, bytearray_at
+from framebuf import FrameBuffer, GS8, RGB565
+from gba_bios import vblank_intr_wait, cpu_set_fast, cpu_fill_fast, uncomp, uncomp_header
+from gba_dma import dma_copy, dma_fill
+from gba_mem import scratch
+import gba_reg
+from gba_reg import IndirectVisitedRegister
 
 REG_BG_PALETTE = 0x05000000  # u16
 REG_SPRITE_PALETTE = 0x05000200  # u16
@@ -18,10 +22,50 @@ FRAMEBUF1_ADDR = 0x0600A000
 BG_TILE_ADDR = 0x06000000
 SPRITE_TILE_ADDR = 0x06010000
 BG_MAP_ADDR = 0x06000000
-
-# tile copy buffer
-tmp_buffer = bytearray(8 * 8)
-tmp_frame = FrameBuffer(tmp_buffer, 8, 8, GS8)
+SCREENBLOCK_SIZE = 32 * 32 * 2
+BG_MAP_LINE_SIZE = 32 * 2  # one row of a regular screenblock
+
+
+def upload(source, destination, length_in_byte, queue=None):
+    """ copy to vram now, or enqueue the copy on a `gba_dma.DMAQueue` """
+    if queue is None:
+        cpu_set_fast(source, destination, length_in_byte)
+    else:
+        queue.enqueue(source, destination, length_in_byte)
+
+
+def upload_blob(blob, destination: int, length_in_byte: int = -1, queue=None):
+    """ copy a bytes constant (e.g. from gba_assets) without a heap copy, by CpuFastSet when
+        it is word aligned whole 32 bytes blocks, else by dma
+    """
+    if length_in_byte < 0:
+        length_in_byte = len(blob)
+    source = addressof(blob)
+    if (source | destination | length_in_byte) & 1:
+        raise ValueError("blob is not halfword aligned.")
+    if not (source & 3 or length_in_byte & 31):
+        upload(source, destination, length_in_byte, queue)
+        return
+    width = 16 if (source | destination | length_in_byte) & 3 else 32
+    if queue is None:
+        dma_copy(source, destination, length_in_byte, width)
+    else:
+        queue.enqueue(source, destination, length_in_byte, width)
+
+
+def fill_memory(destination, value: int, length_in_byte, width: int = 16):
+    """ fill a buffer or a vram region with a 16-bit or 32-bit value,
+        whole 32 bytes blocks by CpuFastSet, the rest by dma
+    """
+    if not isinstance(destination, int):
+        destination = addressof(destination)
+    if width != 32:
+        value = (value & 0xFFFF) | ((value & 0xFFFF) << 16)
+    bulk = length_in_byte & ~31
+    if bulk:
+        cpu_fill_fast(destination, value, bulk)
+    if length_in_byte > bulk:
+        dma_fill(destination + bulk, value, length_in_byte - bulk, 16)
 
 
 def color555(r, g, b):
@@ -37,16 +81,23 @@ def map_background_palette_color_8bpp(palette_index: int, color555: int):
 def map_sprite_palette_color_8bpp(palette_index: int, color555: int):
     if palette_index < 0 or palette_index >= 256:
         return
-    mem16[SPRITE_TILE_ADDR + (2 * palette_index)] = color555 & 0xFFFF
+    mem16[REG_SPRITE_PALETTE + (2 * palette_index)] = color555 & 0xFFFF
+
+
+def load_palette(data, start: int = 0, palette_addr: int = REG_BG_PALETTE, queue=None):
+    """ copy packed color555 values (e.g. NAME_PALETTE of gba_assets) to the palette from color start """
+    upload_blob(data, palette_addr + start * 2, min(len(data), 512 - start * 2), queue)
 
-# all tiles are d-tiles, 8bit palette, to make things simple
+# tiles are d-tiles (8bpp, 256 colors) or s-tiles (4bpp, 16 colors from a palette bank),
+# images are always drawn with one byte per pixel and packed by TileManager
 
 
 class Tile(FrameBuffer):
-    def __init__(self, tile_w: int, tile_h: int):
+    def __init__(self, tile_w: int, tile_h: int, buffer=None):
+        """ buffer (at least tile_w * tile_h * 64 bytes) is allocated when not given """
         self.tile_w = tile_w
         self.tile_h = tile_h
-        self.buffer = bytearray(tile_w * 8 * tile_h * 8)
+        self.buffer = bytearray(tile_w * 8 * tile_h * 8) if buffer is None else buffer
         super().__init__(self.buffer, tile_w * 8, tile_h * 8, GS8)
 
     @property
@@ -54,35 +105,148 @@ class Tile(FrameBuffer):
         return self.tile_w * self.tile_h
 
 
+def scratch_tile(tile_w: int, tile_h: int) -> Tile:
+    """ a Tile drawn in a buffer of gba_mem.scratch, give it back with `release_tile`,
+        the image is not cleared
+    """
+    return Tile(tile_w, tile_h, scratch.take(tile_w * tile_h * 64))
+
+
+def release_tile(tile: Tile):
+    scratch.give(tile.buffer)
+
+
 class TileManager():
-    """ A charblock of tiles, 256 8bpp tiles"""
+    """ A charblock of tiles, 256 8bpp tiles or 512 4bpp tiles"""
 
-    def __init__(self, char_block: int, create_buffer: bool = True):
-        """ 0-3 is bg tiles, 4-5 is sprite tiles """
+    def __init__(self, char_block: int, create_buffer: bool = True, bpp: int = 8):
+        """ 0-3 is bg tiles, 4-5 is sprite tiles, bpp is 8 (d-tiles) or 4 (s-tiles) """
         if char_block < 0 or char_block >= 6:
             raise ValueError()
+        if bpp != 8 and bpp != 4:
+            raise ValueError()
         self.char_block = char_block
+        self.bpp = bpp
+        self.tile_bytes = 8 * bpp  # 8 rows of 8 pixels
         self.buffer = bytearray(256 * 8 * 8) if create_buffer else bytearray()
 
     def __len__(self):
         return len(self.buffer)
 
-    def update_all(self):
-        cpu_set_fast(self.buffer, self.char_block * 256 *
-                     8 * 8 + BG_TILE_ADDR, len(self.buffer))
+    @property
+    def tile_count(self):
+        return len(self.buffer) // self.tile_bytes
+
+    def update_all(self, queue=None):
+        upload(self.buffer, self.char_block * 256 *
+               8 * 8 + BG_TILE_ADDR, len(self.buffer), queue)
+
+    def update_tiles(self, tile_offset: int, tile_count: int, queue=None):
+        """ upload only a range of tiles """
+        start = tile_offset * self.tile_bytes
+        upload(addressof(self.buffer) + start, self.char_block * 256 * 8 * 8 + BG_TILE_ADDR + start,
+               tile_count * self.tile_bytes, queue)
+
+    def load_data(self, data, tile_offset: int = 0, queue=None):
+        """ copy packed tiles (e.g. NAME_TILES of gba_assets) straight to vram,
+            the buffer, if any, gets a copy too
+        """
+        offset = tile_offset * self.tile_bytes
+        if tile_offset < 0 or offset + len(data) > 256 * 8 * 8:
+            raise ValueError("tiles out of charblock.")
+        if self.buffer:
+            upload_blob(data, addressof(self.buffer) + offset)
+        upload_blob(data, self.char_block * 256 * 8 * 8 + BG_TILE_ADDR + offset, len(data), queue)
+
+    def load_compressed(self, data, tile_offset: int = 0, queue=None):
+        """ BIOS decompress packed tiles (an asset with "compress", see tools/gba_compress.py)
+            into the buffer then upload them, or straight to vram without a buffer
+        """
+        offset = tile_offset * self.tile_bytes
+        size = uncomp_header(data) >> 8
+        if tile_offset < 0 or offset + size > 256 * 8 * 8:
+            raise ValueError("tiles out of charblock.")
+        vram = self.char_block * 256 * 8 * 8 + BG_TILE_ADDR + offset
+        if self.buffer:
+            uncomp(data, addressof(self.buffer) + offset)
+            upload(addressof(self.buffer) + offset, vram, size, queue)
+        else:
+            uncomp(data, vram, True)
+
+    def clear(self, color_index: int = 0):
+        """ fill every tile with one palette index """
+        if self.bpp == 4:
+            color_index &= 0x0F
+            color_index |= color_index << 4
+        color_index &= 0xFF
+        fill_memory(self.buffer, color_index | (color_index << 8), len(self.buffer))
 
     def set_tile_data(self, tile: Tile, tile_offset: int):
+        """ pack the image into tile order, cells go left to right, then top to bottom """
+        offset = tile_offset * self.tile_bytes
+        if tile_offset < 0 or offset + tile.tile_size * self.tile_bytes > len(self.buffer):
+            raise ValueError("tiles out of charblock.")
+        if self.bpp == 4:
+            self._pack_4bpp(tile, offset)
+            return
+        src = memoryview(tile.buffer)
+        dst = memoryview(self.buffer)
+        if tile.tile_w == 1:
+            # a single column of cells is already in d-tile order
+            size = tile.tile_h * 64
+            dst[offset: offset + size] = src[0: size]
+            return
+        stride = tile.tile_w * 8
         for y in range(tile.tile_h):
+            row_start = y * 8 * stride
             for x in range(tile.tile_w):
-                # clip the image
-                tmp_frame.blit(tile, -(x * 8), -(y * 8))
-                offset = tile_offset + y * tile.tile_w + x
-                offset *= 8*8
-                self.buffer[offset: offset+8*8] = tmp_buffer
+                # 8 rows of 8 pixels
+                s = row_start + x * 8
+                for _ in range(8):
+                    dst[offset: offset + 8] = src[s: s + 8]
+                    offset += 8
+                    s += stride
+
+    def _pack_4bpp(self, tile: Tile, offset: int):
+        # two pixels per byte, the left pixel in the low nibble
+        src = tile.buffer
+        dst = self.buffer
+        stride = tile.tile_w * 8
+        for y in range(tile.tile_h):
+            row_start = y * 8 * stride
+            for x in range(tile.tile_w):
+                s = row_start + x * 8
+                for _ in range(8):
+                    dst[offset] = (src[s] & 0x0F) | ((src[s + 1] & 0x0F) << 4)
+                    dst[offset + 1] = (src[s + 2] & 0x0F) | ((src[s + 3] & 0x0F) << 4)
+                    dst[offset + 2] = (src[s + 4] & 0x0F) | ((src[s + 5] & 0x0F) << 4)
+                    dst[offset + 3] = (src[s + 6] & 0x0F) | ((src[s + 7] & 0x0F) << 4)
+                    offset += 4
+                    s += stride
+
+    def set_tiles_data(self, tiles, tile_offset: int) -> int:
+        """ pack several images one after another, return the next free tile offset """
+        for tile in tiles:
+            self.set_tile_data(tile, tile_offset)
+            tile_offset += tile.tile_size
+        return tile_offset
+
+
+def regular_bg_entry(tile_index: int, h_flip=False, v_flip=False, palette_bank=0) -> int:
+    """ encode a regular background screen entry """
+    entry = tile_index & 0x03FF
+    entry |= (1 << 10) if h_flip else 0
+    entry |= (1 << 11) if v_flip else 0
+    entry |= (palette_bank & 0b1111) << 12
+    return entry
 
 
 class BGMap():
-    """ background map, align to screenblock """
+    """ background map, align to screenblock
+
+    regular maps keep their entries in an array('H') laid out like vram (32x32 quadrants),
+    affine maps keep one byte per entry in a bytearray
+    """
 
     def __init__(self, screen_block: int, tile_w: int, tile_h: int, is_regular_bg: bool, create_buffer: bool = True):
         if screen_block < 0 or screen_block >= 32:
@@ -91,15 +255,115 @@ class BGMap():
         self.tile_h = tile_h
         self.screen_block = screen_block
         self.byte_per_entry = 2 if is_regular_bg else 1
-        self.buffer = bytearray(
-            tile_w * tile_h * self.byte_per_entry) if create_buffer else bytearray()
+        entry_count = tile_w * tile_h if create_buffer else 0
+        if is_regular_bg:
+            self.buffer = array("H", bytes(entry_count * 2))
+            self._fill_buffer = array("H", bytes(tile_w * 2))
+        else:
+            self.buffer = bytearray(entry_count)
+            self._fill_buffer = bytearray(tile_w)
+        self._view = memoryview(self.buffer)
+        self._fill_view = memoryview(self._fill_buffer)
+        # modified lines (64 bytes each) of every screenblock, lo > hi means clean
+        sb_count = (len(self) + SCREENBLOCK_SIZE - 1) // SCREENBLOCK_SIZE
+        self._dirty_lo = array("H", [0xFFFF] * sb_count)
+        self._dirty_hi = array("H", [0] * sb_count)
 
     def __len__(self):
-        return len(self.buffer)
+        """ size of the map in bytes """
+        return len(self.buffer) * self.byte_per_entry
+
+    def _mark_dirty(self, byte_offset: int):
+        line = byte_offset // BG_MAP_LINE_SIZE
+        sb = byte_offset // SCREENBLOCK_SIZE
+        if line < self._dirty_lo[sb]:
+            self._dirty_lo[sb] = line
+        if line > self._dirty_hi[sb]:
+            self._dirty_hi[sb] = line
+
+    def _mark_all_dirty(self):
+        last_line = (len(self) - 1) // BG_MAP_LINE_SIZE
+        lines_per_sb = SCREENBLOCK_SIZE // BG_MAP_LINE_SIZE
+        for sb in range(len(self._dirty_lo)):
+            self._dirty_lo[sb] = sb * lines_per_sb
+            self._dirty_hi[sb] = min((sb + 1) * lines_per_sb - 1, last_line)
+
+    def _mark_clean(self):
+        for sb in range(len(self._dirty_lo)):
+            self._dirty_lo[sb] = 0xFFFF
+            self._dirty_hi[sb] = 0
+
+    def is_dirty(self) -> bool:
+        for sb in range(len(self._dirty_lo)):
+            if self._dirty_lo[sb] <= self._dirty_hi[sb]:
+                return True
+        return False
+
+    def update_all(self, queue=None):
+        upload(self.buffer, self.screen_block * 32 *
+               8 * 8 + BG_MAP_ADDR, len(self), queue)
+        self._mark_clean()
+
+    def load_data(self, data, queue=None):
+        """ copy an encoded map (e.g. NAME_MAP of gba_assets, same layout as buffer) straight to vram,
+            the buffer, if any, gets a copy too
+        """
+        if self.buffer:
+            if len(data) != len(self):
+                raise ValueError("map size mismatch.")
+            upload_blob(data, addressof(self.buffer))
+            self._mark_clean()
+        upload_blob(data, self.screen_block * 32 * 8 * 8 + BG_MAP_ADDR, len(data), queue)
+
+    def load_compressed(self, data, queue=None):
+        """ BIOS decompress an encoded map (an asset with "compress") into the buffer then upload it,
+            or straight to vram without a buffer
+        """
+        size = uncomp_header(data) >> 8
+        vram = self.screen_block * 32 * 8 * 8 + BG_MAP_ADDR
+        if self.buffer:
+            if size != len(self):
+                raise ValueError("map size mismatch.")
+            uncomp(data, self.buffer)
+            upload(self.buffer, vram, size, queue)
+            self._mark_clean()
+        else:
+            uncomp(data, vram, True)
+
+    def flush(self, queue=None):
+        """ copy only the modified lines of each screenblock to vram, then mark the map clean """
+        lo = self._dirty_lo
+        hi = self._dirty_hi
+        src = addressof(self.buffer)
+        dst = self.screen_block * 32 * 8 * 8 + BG_MAP_ADDR
+        for sb in range(len(lo)):
+            if lo[sb] > hi[sb]:
+                continue
+            start = lo[sb] * BG_MAP_LINE_SIZE
+            end = min((hi[sb] + 1) * BG_MAP_LINE_SIZE, len(self))
+            upload(src + start, dst + start, end - start, queue)
+            lo[sb] = 0xFFFF
+            hi[sb] = 0
+
+    def entry_index(self, tile_x: int, tile_y: int) -> int:
+        """ index of the entry at (tile_x, tile_y) in buffer """
+        if self.byte_per_entry == 1:
+            return self.tile_w * tile_y + tile_x
+        n = tile_y * 32 + tile_x
+        if tile_x >= 32:
+            n += 0x03E0
+        if tile_y >= 32 and self.tile_w >= 64:
+            n += 0x0400
+        return n
+
+    def get_entry(self, tile_x: int, tile_y: int) -> int:
+        return self.buffer[self.entry_index(tile_x, tile_y)]
 
-    def update_all(self):
-        cpu_set_fast(self.buffer, self.screen_block * 32 *
-                     8 * 8 + BG_MAP_ADDR, len(self.buffer))
+    def set_entry(self, tile_x: int, tile_y: int, entry: int):
+        """ write a pre-encoded entry, see `regular_bg_entry` """
+        n = self.entry_index(tile_x, tile_y)
+        self.buffer[n] = entry
+        self._mark_dirty(n * self.byte_per_entry)
 
     def set_regular_bg_tile_at(self, tile_x: int, tile_y: int, tile_index: int, h_flip=False, v_flip=False, palette_bank=0, apply_now=False):
         # calc index
@@ -114,8 +378,9 @@ class BGMap():
         tile_data |= (1 << 11) if v_flip else 0
         tile_data |= (palette_bank & 0b1111) << 12
         if buf:
-            buf[n * 2] = tile_data & 0xFF
-            buf[n * 2 + 1] = (tile_data >> 8) & 0xFF
+            buf[n] = tile_data
+            if not apply_now:
+                self._mark_dirty(n * 2)
         if apply_now:
             _off = self.screen_block * 32 * 8 * 8 + BG_MAP_ADDR
             _off += n * 2
@@ -126,6 +391,8 @@ class BGMap():
         buf = self.buffer
         n = self.tile_w * tile_y + tile_x
         buf[n] = tile_index & 0xFF
+        if not apply_now:
+            self._mark_dirty(n)
         if apply_now:
             n -= (n % 2)
             _off = self.screen_block * 32 * 8 * 8 + BG_MAP_ADDR
@@ -141,14 +408,89 @@ class BGMap():
             )
         else:
             self.set_affine_bg_tile_at(tile_x, tile_y, tile_index, apply_now)
-    
+
+    def _write_row(self, tile_x: int, tile_y: int, src: memoryview, count: int):
+        # split the row at the 32x32 quadrant border, one slice copy per part
+        bpe = self.byte_per_entry
+        view = self._view
+        i = 0
+        while i < count:
+            n = self.entry_index(tile_x + i, tile_y)
+            seg = count - i
+            if bpe == 2 and tile_x + i < 32 and tile_x + i + seg > 32:
+                seg = 32 - (tile_x + i)
+            view[n: n + seg] = src[i: i + seg]
+            self._mark_dirty(n * bpe)
+            self._mark_dirty((n + seg - 1) * bpe)
+            i += seg
+
+    def _fill_row(self, entry: int, count: int) -> memoryview:
+        # fill the scratch row by doubling the filled part
+        view = self._fill_view
+        view[0] = entry
+        filled = 1
+        while filled < count:
+            seg = min(filled, count - filled)
+            view[filled: filled + seg] = view[0: seg]
+            filled += seg
+        return view
+
+    def fill_rect(self, tile_x: int, tile_y: int, tile_w: int, tile_h: int, entry: int):
+        """ fill a rectangle with one pre-encoded entry """
+        if tile_w <= 0 or tile_h <= 0:
+            return
+        row = self._fill_row(entry, tile_w)
+        for y in range(tile_y, tile_y + tile_h):
+            self._write_row(tile_x, y, row, tile_w)
+
+    def blit_row(self, tile_x: int, tile_y: int, entries):
+        """ copy pre-encoded entries to a row,
+            entries is array('H') for regular maps, bytearray for affine maps
+        """
+        self._write_row(tile_x, tile_y, memoryview(entries), len(entries))
+
+    def blit_column(self, tile_x: int, tile_y: int, entries):
+        """ copy pre-encoded entries to a column """
+        buf = self.buffer
+        bpe = self.byte_per_entry
+        stride = 32 if bpe == 2 else self.tile_w
+        sb_entries = SCREENBLOCK_SIZE // bpe
+        n = -1
+        for i in range(len(entries)):
+            y = tile_y + i
+            if n >= 0 and y != 32 and (n + stride) // sb_entries == n // sb_entries:
+                n += stride
+            else:
+                # first entry, or moved to another screenblock
+                if n >= 0:
+                    self._mark_dirty(n * bpe)
+                n = self.entry_index(tile_x, y)
+                self._mark_dirty(n * bpe)
+            buf[n] = entries[i]
+        if n >= 0:
+            self._mark_dirty(n * bpe)
+
+    def blit_rect(self, tile_x: int, tile_y: int, tile_w: int, tile_h: int, entries):
+        """ copy a tile_w x tile_h block of pre-encoded entries, row by row """
+        src = memoryview(entries)
+        for y in range(tile_h):
+            self._write_row(tile_x, tile_y + y, src[y * tile_w: (y + 1) * tile_w], tile_w)
+
+    def clear(self, entry: int = 0):
+        """ fill the whole map with one pre-encoded entry """
+        if not self.buffer:
+            return
+        if self.byte_per_entry == 1:
+            entry = (entry & 0xFF) | ((entry & 0xFF) << 8)
+        fill_memory(self.buffer, entry, len(self))
+        self._mark_all_dirty()
 
 
 class Background():
     def __init__(self, bgcnt: IndirectVisitedRegister):
         self._bgcnt = bgcnt
         self.reset = bgcnt.reset
-        self.apply = bgcnt.write_by_halfword
+        self.apply = bgcnt.apply
 
     def set_priority(self, prio: int):
         """ drawing order of backgrounds. Values: 0-3 """
@@ -198,23 +540,30 @@ class Background():
 
 class Display():
     def __init__(self):
-        self.reset = REG_DISPCNT.reset
-        self.apply = REG_DISPCNT.write_by_halfword
+        self.reset = gba_reg.REG_DISPCNT.reset
+        self.apply = gba_reg.REG_DISPCNT.apply
 
     def enable_bg0(self, status: bool):
-        REG_DISPCNT.BG0 = 1 if status else 0
+        gba_reg.REG_DISPCNT.BG0 = 1 if status else 0
 
     def enable_bg1(self, status: bool):
-        REG_DISPCNT.BG1 = 1 if status else 0
+        gba_reg.REG_DISPCNT.BG1 = 1 if status else 0
 
     def enable_bg2(self, status: bool):
-        REG_DISPCNT.BG2 = 1 if status else 0
+        gba_reg.REG_DISPCNT.BG2 = 1 if status else 0
 
     def enable_bg3(self, status: bool):
-        REG_DISPCNT.BG3 = 1 if status else 0
+        gba_reg.REG_DISPCNT.BG3 = 1 if status else 0
+
+    def enable_obj(self, status: bool):
+        gba_reg.REG_DISPCNT.OBJ = 1 if status else 0
+
+    def set_obj_1d(self, status: bool):
+        """ 1D object tile mapping, the tiles of a sprite follow each other in memory """
+        gba_reg.REG_DISPCNT.OBJ_1D = 1 if status else 0
 
     def set_blank_display(self, blank: bool):
-        REG_DISPCNT.BLANK = 1 if blank else 0
+        gba_reg.REG_DISPCNT.BLANK = 1 if blank else 0
 
 
 class DispalyMode1(Display):
@@ -225,40 +574,325 @@ class DispalyMode1(Display):
     def init_display(self):
         self.reset()
         # set mode 1
-        REG_DISPCNT.reset()
-        REG_DISPCNT.MODE = MODE_1
-        REG_DISPCNT.write_by_halfword()
+        gba_reg.REG_DISPCNT.reset()
+        gba_reg.REG_DISPCNT.MODE = MODE_1
+        gba_reg.REG_DISPCNT.apply()
 
 
 class DisplayMode4(FrameBuffer):
+    """ mode 4 bitmap drawn in ram, `show` copies the modified scanlines to the back page and flips """
+
     def __init__(self):
         self.buffer = bytearray(240*160)
         self.current_page = 0
-        super(FrameBuffer).__init__(self.buffer, 240, 160, GS8)
+        # modified scanlines of this frame and of the last one, lo > hi means clean
+        self._dirty_lo = 0
+        self._dirty_hi = 159
+        self._prev_lo = 0
+        self._prev_hi = 159
+        super().__init__(self.buffer, 240, 160, GS8)
+
+    def mark_dirty(self, y0: int = 0, y1: int = 159):
+        """ mark scanlines y0 to y1 (inclusive) as modified """
+        if y0 < 0:
+            y0 = 0
+        if y1 > 159:
+            y1 = 159
+        if y0 < self._dirty_lo:
+            self._dirty_lo = y0
+        if y1 > self._dirty_hi:
+            self._dirty_hi = y1
 
     def init_display(self):
         # set mode 4 (8bit paletted bitmapped mode), enable bg2
         self.current_page = 0
-        REG_DISPCNT.PAGE = 0
-        REG_DISPCNT.MODE = MODE_4
-        REG_DISPCNT.BG2 = 1
-        REG_DISPCNT.write_by_halfword()
+        gba_reg.REG_DISPCNT.PAGE = 0
+        gba_reg.REG_DISPCNT.MODE = MODE_4
+        gba_reg.REG_DISPCNT.BG2 = 1
+        gba_reg.REG_DISPCNT.apply()
+        # both pages are unknown
+        self._dirty_lo = self._prev_lo = 0
+        self._dirty_hi = self._prev_hi = 159
+
+    def clear(self, color: int = 0):
+        color &= 0xFF
+        fill_memory(self.buffer, color | (color << 8), 240*160)
+        self.mark_dirty()
+
+    # drawing calls record the scanlines they touch
+
+    def fill(self, c):
+        super().fill(c)
+        self.mark_dirty()
+
+    def pixel(self, x, y, *args):
+        if args:
+            self.mark_dirty(y, y)
+        return super().pixel(x, y, *args)
+
+    def hline(self, x, y, w, c):
+        super().hline(x, y, w, c)
+        self.mark_dirty(y, y)
+
+    def vline(self, x, y, h, c):
+        super().vline(x, y, h, c)
+        self.mark_dirty(y, y + h - 1)
+
+    def line(self, x1, y1, x2, y2, c):
+        super().line(x1, y1, x2, y2, c)
+        self.mark_dirty(min(y1, y2), max(y1, y2))
+
+    def rect(self, x, y, w, h, c, *args):
+        super().rect(x, y, w, h, c, *args)
+        self.mark_dirty(y, y + h - 1)
+
+    def fill_rect(self, x, y, w, h, c):
+        super().fill_rect(x, y, w, h, c)
+        self.mark_dirty(y, y + h - 1)
+
+    def ellipse(self, x, y, xr, yr, c, *args):
+        super().ellipse(x, y, xr, yr, c, *args)
+        self.mark_dirty(y - yr, y + yr)
+
+    def poly(self, x, y, coords, c, *args):
+        super().poly(x, y, coords, c, *args)
+        self.mark_dirty()
+
+    def text(self, s, x, y, *args):
+        super().text(s, x, y, *args)
+        self.mark_dirty(y, y + 7)
+
+    def blit(self, fbuf, x, y, *args):
+        super().blit(fbuf, x, y, *args)
+        if isinstance(fbuf, Tile):
+            self.mark_dirty(y, y + fbuf.tile_h * 8 - 1)
+        else:
+            self.mark_dirty()
+
+    def scroll(self, xstep, ystep):
+        super().scroll(xstep, ystep)
+        self.mark_dirty()
 
     def show(self):
         # check page
-        self.current_page = REG_DISPCNT.PAGE
-        # write data
-        cpu_set_fast(
-            self.buffer, FRAMEBUF0_ADDR if self.current_page else FRAMEBUF1_ADDR, 240*160)
+        self.current_page = gba_reg.REG_DISPCNT.PAGE
+        # the back page was last written two frames ago, it misses the last frame changes too
+        lo = min(self._dirty_lo, self._prev_lo)
+        hi = max(self._dirty_hi, self._prev_hi)
+        if lo <= hi:
+            start = lo * 240
+            dma_copy(
+                addressof(self.buffer) + start,
+                (FRAMEBUF0_ADDR if self.current_page else FRAMEBUF1_ADDR) + start,
+                (hi - lo + 1) * 240)
+        self._prev_lo = self._dirty_lo
+        self._prev_hi = self._dirty_hi
+        self._dirty_lo = 160
+        self._dirty_hi = -1
         vblank_intr_wait()
         if self.current_page:
-            REG_DISPCNT.PAGE = 0
+            gba_reg.REG_DISPCNT.PAGE = 0
         else:
-            REG_DISPCNT.PAGE = 1
-        REG_DISPCNT.write_by_halfword()
+            gba_reg.REG_DISPCNT.PAGE = 1
+        gba_reg.REG_DISPCNT.apply()
+
+
+class DisplayMode4Direct(Display):
+    """ mode 4 drawn straight into the hidden vram page, no ram copy of the screen
+
+        vram can not be written by bytes (a byte store lands in both halves of the halfword),
+        so the page is viewed as 120x160 halfword "pixel pairs" for fills,
+        odd edges are read-modify-write halfwords, and text/blit/line/ellipse/poly are drawn
+        in a ram band of whole scanlines that is copied from and back to the page, one band
+        after the other for shapes taller than the band. `scroll` is not supported.
+        after `show` the new back page holds the frame before the last one.
+    """
+
+    def __init__(self, band_rows: int = 8):
+        super().__init__()
+        self.current_page = 0
+        self._pairs = (
+            FrameBuffer(bytearray_at(FRAMEBUF0_ADDR, 240*160), 120, 160, RGB565),
+            FrameBuffer(bytearray_at(FRAMEBUF1_ADDR, 240*160), 120, 160, RGB565),
+        )
+        self._band_buffer = bytearray(240 * band_rows)
+        self.band_rows = band_rows
+        self.band = FrameBuffer(self._band_buffer, 240, band_rows, GS8)
+        self.band_y = 0
+        self._band_h = 0
 
+    def init_display(self):
+        # set mode 4 (8bit paletted bitmapped mode), enable bg2
+        self.current_page = 0
+        gba_reg.REG_DISPCNT.PAGE = 0
+        gba_reg.REG_DISPCNT.MODE = MODE_4
+        gba_reg.REG_DISPCNT.BG2 = 1
+        gba_reg.REG_DISPCNT.apply()
+
+    @property
+    def back_addr(self) -> int:
+        return FRAMEBUF0_ADDR if self.current_page else FRAMEBUF1_ADDR
+
+    def fill(self, c):
+        c &= 0xFF
+        fill_memory(self.back_addr, c | (c << 8), 240*160)
+
+    clear = fill
+
+    def pixel(self, x, y, c=None):
+        """ read (c is None) or set a pixel, only a read returns a value """
+        if x < 0 or x >= 240 or y < 0 or y >= 160:
+            return None
+        addr = self.back_addr + y * 240 + (x & ~1)
+        val = mem16[addr]
+        if c is None:
+            return (val >> 8) if x & 1 else (val & 0xFF)
+        if x & 1:
+            mem16[addr] = (val & 0x00FF) | ((c & 0xFF) << 8)
+        else:
+            mem16[addr] = (val & 0xFF00) | (c & 0xFF)
+        return None
+
+    def _column(self, x, y, h, c):
+        # one pixel wide, read-modify-write every halfword
+        addr = self.back_addr + y * 240 + (x & ~1)
+        c &= 0xFF
+        if x & 1:
+            mask, c = 0x00FF, c << 8
+        else:
+            mask = 0xFF00
+        for _ in range(h):
+            mem16[addr] = (mem16[addr] & mask) | c
+            addr += 240
+
+    def fill_rect(self, x, y, w, h, c):
+        # clip
+        if x < 0:
+            w += x
+            x = 0
+        if y < 0:
+            h += y
+            y = 0
+        w = min(w, 240 - x)
+        h = min(h, 160 - y)
+        if w <= 0 or h <= 0:
+            return
+        if x & 1:
+            self._column(x, y, h, c)
+            x += 1
+            w -= 1
+        if w & 1:
+            self._column(x + w - 1, y, h, c)
+            w -= 1
+        if w > 0:
+            c &= 0xFF
+            self._pairs[1 - self.current_page].fill_rect(x >> 1, y, w >> 1, h, c | (c << 8))
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.fill_rect(x, y, w, 1, c)
+        self.fill_rect(x, y + h - 1, w, 1, c)
+        self.fill_rect(x, y + 1, 1, h - 2, c)
+        self.fill_rect(x + w - 1, y + 1, 1, h - 2, c)
+
+    def begin_band(self, y: int, h: int) -> FrameBuffer:
+        """ load scanlines y to y+h-1 of the back page into the ram band and return it,
+            draw on it with row `y - self.band_y`, then call `end_band`
+        """
+        y0 = max(y, 0)
+        h = min(min(y + h, 160) - y0, self.band_rows)
+        self.band_y = y0
+        self._band_h = h
+        if h > 0:
+            dma_copy(self.back_addr + y0 * 240, self._band_buffer, h * 240)
+        return self.band
+
+    def end_band(self):
+        """ write the band back to the page, by words """
+        if self._band_h > 0:
+            dma_copy(self._band_buffer, self.back_addr + self.band_y * 240, self._band_h * 240)
+        self._band_h = 0
+
+    def text(self, s, x, y, c=1):
+        band = self.begin_band(y, 8)
+        band.text(s, x, y - self.band_y, c)
+        self.end_band()
+
+    def _bands(self, y0: int, y1: int):
+        """ yield the band over scanlines y0 to y1 (inclusive) piece by piece, written back after each """
+        row = max(y0, 0)
+        while row <= y1:
+            band = self.begin_band(row, y1 - row + 1)
+            if self._band_h <= 0:
+                break
+            yield band
+            self.end_band()
+            row = self.band_y + self.band_rows
+
+    def line(self, x1, y1, x2, y2, c):
+        for band in self._bands(min(y1, y2), max(y1, y2)):
+            dy = self.band_y
+            band.line(x1, y1 - dy, x2, y2 - dy, c)
+
+    def ellipse(self, x, y, xr, yr, c, *args):
+        for band in self._bands(y - yr, y + yr):
+            band.ellipse(x, y - self.band_y, xr, yr, c, *args)
+
+    def poly(self, x, y, coords, c, *args):
+        lo = hi = coords[1]
+        for i in range(3, len(coords), 2):
+            lo = min(lo, coords[i])
+            hi = max(hi, coords[i])
+        for band in self._bands(y + lo, y + hi):
+            band.poly(x, y - self.band_y, coords, c, *args)
+
+    def blit(self, fbuf, x, y, key=-1, height=None):
+        """ height is needed when fbuf is not a `Tile` """
+        if height is None:
+            height = fbuf.tile_h * 8
+        row = y
+        while row < y + height:
+            band = self.begin_band(row, y + height - row)
+            if self._band_h <= 0:
+                break
+            band.blit(fbuf, x, y - self.band_y, key)
+            self.end_band()
+            row = self.band_y + self.band_rows
 
-BG0 = Background(REG_BG0CNT)
-BG1 = Background(REG_BG1CNT)
-BG2 = Background(REG_BG2CNT)
-BG3 = Background(REG_BG3CNT)
+    def show(self):
+        """ wait for vblank and display the back page, no copy """
+        self.current_page = gba_reg.REG_DISPCNT.PAGE
+        vblank_intr_wait()
+        if self.current_page:
+            gba_reg.REG_DISPCNT.PAGE = 0
+            self.current_page = 0
+        else:
+            gba_reg.REG_DISPCNT.PAGE = 1
+            self.current_page = 1
+        gba_reg.REG_DISPCNT.apply()
+
+
+# BG0-BG3 are built on first access
+_BACKGROUND_REGISTERS = {
+    "BG0": "REG_BG0CNT",
+    "BG1": "REG_BG1CNT",
+    "BG2": "REG_BG2CNT",
+    "BG3": "REG_BG3CNT",
+}
+
+
+def __getattr__(name: str):
+    reg_name = _BACKGROUND_REGISTERS.get(name)
+    if reg_name is None:
+        raise AttributeError(name)
+    bg = Background(getattr(gba_reg, reg_name))
+    globals()[name] = bg
+    return bg
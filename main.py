@@ -1,7 +1,7 @@
 print("==== main ====")
-import gba # type: ignore
 import gc
 import utime
+import gba_boot
 
 def free():
     start: int = utime.ticks_ms()
@@ -10,17 +10,19 @@ def free():
     end: int = utime.ticks_ms()
     print(mem, utime.ticks_diff(end, start))
 
-import gba_video
-import gba_keypad
-import gba_reg
-import gba_bios
+# only what the scene uses, timed
+gba_reg = gba_boot.timed_import("gba_reg")
+gba_video = gba_boot.timed_import("gba_video")
+gba_frame = gba_boot.timed_import("gba_frame")
+gba_boot.print_report()
+import gba_mem # loaded by gba_boot already
 
 gba_video.map_background_palette_color_8bpp(0, gba_video.color555(255, 255, 255))
 gba_video.map_background_palette_color_8bpp(1, gba_video.color555(0, 0, 0))
 
 disp = gba_video.DispalyMode1()
 bg_tile_block = gba_video.TileManager(0)
-tile_image = gba_video.Tile(17, 1)
+tile_image = gba_video.scratch_tile(17, 1)
 bg_map = gba_video.BGMap(16, 64, 64, True, True)
 # bg_map = gba_video.BGMap(16, 64, 64, False, True)
 bg0 = gba_video.BG0
@@ -28,8 +30,10 @@ bg2 = gba_video.BG2
 disp.init_display()
 disp.set_blank_display(True)
 disp.apply()
+tile_image.fill(0)
 tile_image.text(" 0123456789ABCDEF", 0, 0, 1)
 bg_tile_block.set_tile_data(tile_image, 0)
+gba_video.release_tile(tile_image)
 bg_tile_block.update_all()
 bg_map.set_bg_tile_at(1, 1, 5)
 bg_map.set_bg_tile_at(2, 2, 4)
@@ -55,26 +59,34 @@ disp.set_blank_display(False)
 disp.apply()
 gba_reg.REG_BG0OFS.HOFS = 4
 gba_reg.REG_BG0OFS.VOFS = 4
-gba_reg.REG_BG0OFS.apply()
+gba_reg.commit()
 # gba_reg.REG_BG2OFS.HOFS = 4
 # gba_reg.REG_BG2OFS.VOFS = 4
 # gba_reg.REG_BG2OFS.apply()
 free()
 
 import urandom
-while True:
-    start: int = utime.ticks_ms()
+
+def update():
     bg_map.set_bg_tile_at(1, 1, urandom.randint(1, 16))
     bg_map.set_bg_tile_at(2, 2, urandom.randint(1, 16))
     bg_map.set_bg_tile_at(3, 3, urandom.randint(1, 16))
     bg_map.set_bg_tile_at(4, 4, urandom.randint(1, 16))
     bg_map.set_bg_tile_at(5, 5, urandom.randint(1, 16))
-    end: int = utime.ticks_ms()
-    print("Loop time:", utime.ticks_diff(end, start), "ms")
-    # print(gc.mem_free())
-    gba_bios.vblank_intr_wait()
-    bg_map.update_all()
+    # print(frame.phase_time[gba_frame.PHASE_UPDATE], frame.time_unit, frame.missed_vblanks, "missed")
+    # print(memory.alloc.last, "bytes,", memory.collections, "collections,", memory.deferred, "deferred")
+
+def commit():
+    bg_map.flush()
+    gba_reg.commit()
+
+memory = gba_mem.GCPolicy()
+frame = gba_frame.FrameScheduler(60, memory=memory)
+frame.on_update(update)
+frame.on_commit(commit)
+frame.run()
 
+# gba_keypad = gba_boot.timed_import("gba_keypad")
 # disp = gba_video.DisplayMode4()
 # disp.init_display()
 # disp.text("Hello World", 16, 16, 1)
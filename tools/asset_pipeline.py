@@ -0,0 +1,393 @@
+"""
+Build time asset converter, run by build_script.before_build.
+
+Reads assets/manifest.json and writes a module of bytes constants already in the layout
+of vram (packed d-tiles / s-tiles, screen entries in 32x32 quadrants, color555 palettes),
+loaded with TileManager.load_data, BGMap.load_data and gba_video.load_palette.
+
+manifest:
+
+    {
+        "output": "lib/gba_assets.py",
+        "assets": [
+            {"name": "font", "kind": "tiles", "image": "font.png", "bpp": 4},
+            {"name": "level", "kind": "map", "image": "level.png", "bpp": 8},
+            {"name": "hud", "kind": "map", "width": 32, "height": 32, "cells": [[1, 2, 3]]},
+            {"name": "sky", "kind": "palette", "colors": ["#000000", "#88ccff"]}
+        ]
+    }
+
+tiles: the image cut in 8x8 cells, left to right then top to bottom -> NAME_TILES,
+    NAME_TILE_COUNT, NAME_BPP, NAME_PALETTE.
+map from an image: the unique cells (flipped copies reuse a tile on regular maps) -> NAME_TILES,
+    NAME_TILE_COUNT, NAME_BPP, NAME_PALETTE, NAME_MAP, NAME_MAP_SIZE (tiles), NAME_MAP_REGULAR.
+tiles of one asset fit one charblock: 256 at 8bpp, 512 at 4bpp.
+map from cells: rows of tile indices, "fill" for the rest, "palette_bank", "regular".
+palette: "colors" or "image" -> NAME_PALETTE.
+"compress": "lz77", "rle", "huff" or "auto" (the smallest) stores NAME_TILES and NAME_MAP as
+    BIOS compressed streams (see tools/gba_compress.py), NAME_COMPRESSED is True, load them with
+    TileManager.load_compressed and BGMap.load_compressed.
+
+indexed PNGs keep their palette indices, truecolor PNGs get a palette in order of
+appearance from index 1, index 0 is for transparent pixels.
+palettes are padded to whole 16 colors banks.
+"""
+import json
+import os
+import struct
+import sys
+import zlib
+from gba_compress import compress, CompressError
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+COLOR_GRAY = 0
+COLOR_RGB = 2
+COLOR_INDEXED = 3
+COLOR_GRAY_ALPHA = 4
+COLOR_RGBA = 6
+_CHANNELS = {COLOR_GRAY: 1, COLOR_RGB: 3, COLOR_INDEXED: 1, COLOR_GRAY_ALPHA: 2, COLOR_RGBA: 4}
+
+
+class AssetError(Exception):
+    pass
+
+
+def color555(r: int, g: int, b: int) -> int:
+    return ((r >> 3) & 0b11111) | (((g >> 3) & 0b11111) << 5) | (((b >> 3) & 0b11111) << 10)
+
+
+def parse_color(text: str) -> int:
+    """ "#RRGGBB" to color555 """
+    value = int(text.lstrip("#"), 16)
+    return color555((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF)
+
+
+# png
+
+def _unfilter(data: bytes, width: int, height: int, bpp: int, row_bytes: int) -> bytearray:
+    out = bytearray(row_bytes * height)
+    prev = bytearray(row_bytes)
+    pos = 0
+    for y in range(height):
+        kind = data[pos]
+        row = bytearray(data[pos + 1: pos + 1 + row_bytes])
+        pos += 1 + row_bytes
+        for i in range(row_bytes):
+            a = row[i - bpp] if i >= bpp else 0
+            b = prev[i]
+            c = prev[i - bpp] if i >= bpp else 0
+            if kind == 1:
+                row[i] = (row[i] + a) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + b) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + ((a + b) >> 1)) & 0xFF
+            elif kind == 4:
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                pred = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+                row[i] = (row[i] + pred) & 0xFF
+            elif kind != 0:
+                raise AssetError("bad png filter " + str(kind))
+        out[y * row_bytes: (y + 1) * row_bytes] = row
+        prev = row
+    return out
+
+
+def read_png(path: str):
+    """ return (width, height, pixels, palette), pixels are palette indices (one per pixel),
+        palette is a list of color555
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(PNG_SIGNATURE):
+        raise AssetError(path + ": not a png")
+    pos = len(PNG_SIGNATURE)
+    idat = []
+    plte = b""
+    header = None
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos: pos + 8])
+        chunk = data[pos + 8: pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif kind == b"PLTE":
+            plte = chunk
+        elif kind == b"IDAT":
+            idat.append(chunk)
+        elif kind == b"IEND":
+            break
+    if header is None:
+        raise AssetError(path + ": no IHDR")
+    width, height, depth, color_type, _, _, interlace = header
+    if interlace:
+        raise AssetError(path + ": interlaced png is not supported")
+    if color_type not in _CHANNELS:
+        raise AssetError(path + ": unknown png color type")
+    if depth > 8 or (depth != 8 and color_type not in (COLOR_GRAY, COLOR_INDEXED)):
+        raise AssetError(path + ": only 8-bit truecolor and up to 8-bit gray / indexed png are supported")
+    channels = _CHANNELS[color_type]
+    bits = depth * channels
+    row_bytes = (width * bits + 7) // 8
+    raw = _unfilter(zlib.decompress(b"".join(idat)), width, height, max(1, bits // 8), row_bytes)
+    if color_type in (COLOR_INDEXED, COLOR_GRAY) and depth < 8:
+        # unpack 1/2/4 bit samples, leftmost pixel in the high bits
+        samples = bytearray(width * height)
+        per_byte = 8 // depth
+        mask = (1 << depth) - 1
+        for y in range(height):
+            for x in range(width):
+                byte = raw[y * row_bytes + x // per_byte]
+                samples[y * width + x] = (byte >> ((per_byte - 1 - x % per_byte) * depth)) & mask
+        raw = samples
+    if color_type == COLOR_INDEXED:
+        palette = [color555(*plte[i: i + 3]) for i in range(0, len(plte), 3)]
+        return width, height, bytearray(raw), palette
+    if color_type == COLOR_GRAY and depth < 8:
+        scale = 255 // ((1 << depth) - 1)
+        raw = bytearray(v * scale for v in raw)
+    return (width, height) + _index_colors(raw, width * height, channels, color_type)
+
+
+def _index_colors(raw: bytes, count: int, channels: int, color_type: int):
+    # truecolor to indices, index 0 is transparent
+    palette = [0]
+    index = {}
+    pixels = bytearray(count)
+    for i in range(count):
+        px = raw[i * channels: (i + 1) * channels]
+        if color_type in (COLOR_GRAY_ALPHA, COLOR_RGBA) and px[-1] < 128:
+            continue
+        if color_type in (COLOR_GRAY, COLOR_GRAY_ALPHA):
+            color = color555(px[0], px[0], px[0])
+        else:
+            color = color555(px[0], px[1], px[2])
+        if color not in index:
+            if len(palette) >= 256:
+                raise AssetError("more than 255 colors")
+            index[color] = len(palette)
+            palette.append(color)
+        pixels[i] = index[color]
+    return pixels, palette
+
+
+# conversion
+
+def cut_cells(width: int, height: int, pixels: bytes):
+    """ 8x8 cells of the image, left to right then top to bottom, 64 bytes each """
+    if width % 8 or height % 8:
+        raise AssetError("image size must be a multiple of 8")
+    cells = []
+    for cy in range(0, height, 8):
+        for cx in range(0, width, 8):
+            cell = bytearray()
+            for y in range(cy, cy + 8):
+                cell += pixels[y * width + cx: y * width + cx + 8]
+            cells.append(bytes(cell))
+    return cells
+
+
+def pack_cell(cell: bytes, bpp: int) -> bytes:
+    """ one 8x8 cell as a d-tile (8bpp) or s-tile (4bpp, left pixel in the low nibble) """
+    if bpp == 8:
+        return cell
+    if max(cell) > 0x0F:
+        raise AssetError("4bpp tiles need palette indices below 16")
+    return bytes(cell[i] | (cell[i + 1] << 4) for i in range(0, 64, 2))
+
+
+def _flip(cell: bytes, h_flip: bool, v_flip: bool) -> bytes:
+    rows = [cell[y * 8: y * 8 + 8] for y in range(8)]
+    if v_flip:
+        rows.reverse()
+    if h_flip:
+        rows = [row[::-1] for row in rows]
+    return b"".join(rows)
+
+
+def entry_index(tile_x: int, tile_y: int, tile_w: int) -> int:
+    """ same layout as gba_video.BGMap for regular maps """
+    n = tile_y * 32 + tile_x
+    if tile_x >= 32:
+        n += 0x03E0
+    if tile_y >= 32 and tile_w >= 64:
+        n += 0x0400
+    return n
+
+
+def check_map_size(tile_w: int, tile_h: int, regular: bool):
+    if regular:
+        if tile_w not in (32, 64) or tile_h not in (32, 64):
+            raise AssetError("regular maps are 32 or 64 tiles wide and high")
+    elif tile_w != tile_h or tile_w not in (16, 32, 64, 128):
+        raise AssetError("affine maps are 16, 32, 64 or 128 tiles square")
+
+
+def encode_map(entries, tile_w: int, tile_h: int, regular: bool) -> bytes:
+    """ entries row by row (regular: screen entries, affine: tile indices) in vram layout """
+    if regular:
+        out = [0] * (tile_w * tile_h)
+        for y in range(tile_h):
+            for x in range(tile_w):
+                out[entry_index(x, y, tile_w)] = entries[y * tile_w + x]
+        return struct.pack("<{}H".format(len(out)), *out)
+    if max(entries) > 0xFF:
+        raise AssetError("affine maps have at most 256 tiles")
+    return bytes(entries)
+
+
+def regular_entry(tile_index: int, h_flip=False, v_flip=False, palette_bank=0) -> int:
+    return (tile_index & 0x03FF) | (h_flip << 10) | (v_flip << 11) | ((palette_bank & 0x0F) << 12)
+
+
+def charblock_tiles(bpp: int) -> int:
+    """ tiles that fit one 16 KB charblock, what TileManager.load_data takes """
+    return 16384 // (8 * bpp)
+
+
+def map_from_image(width: int, height: int, pixels: bytes, bpp: int, regular: bool, palette_bank: int = 0):
+    """ return (tiles, tile_count, map blob, tile_w, tile_h) """
+    tile_w = width // 8
+    tile_h = height // 8
+    check_map_size(tile_w, tile_h, regular)
+    tiles = []
+    seen = {}
+    entries = []
+    for cell in cut_cells(width, height, pixels):
+        entry = None
+        for h_flip, v_flip in ((False, False), (True, False), (False, True), (True, True)) if regular else ((False, False),):
+            key = _flip(cell, h_flip, v_flip)
+            if key in seen:
+                entry = regular_entry(seen[key], h_flip, v_flip, palette_bank) if regular else seen[key]
+                break
+        if entry is None:
+            seen[cell] = len(tiles)
+            tiles.append(pack_cell(cell, bpp))
+            entry = regular_entry(seen[cell], palette_bank=palette_bank) if regular else seen[cell]
+        entries.append(entry)
+    if len(tiles) > charblock_tiles(bpp):
+        raise AssetError("too many unique tiles for one charblock: " + str(len(tiles)))
+    return b"".join(tiles), len(tiles), encode_map(entries, tile_w, tile_h, regular), tile_w, tile_h
+
+
+def map_from_cells(asset: dict) -> bytes:
+    tile_w = asset["width"]
+    tile_h = asset["height"]
+    regular = asset.get("regular", True)
+    check_map_size(tile_w, tile_h, regular)
+    fill = asset.get("fill", 0)
+    bank = asset.get("palette_bank", 0)
+    entries = [fill] * (tile_w * tile_h)
+    for y, row in enumerate(asset.get("cells", [])):
+        for x, tile in enumerate(row):
+            entries[y * tile_w + x] = tile
+    if regular:
+        entries = [regular_entry(tile, palette_bank=bank) for tile in entries]
+    return encode_map(entries, tile_w, tile_h, regular)
+
+
+def pack_palette(colors) -> bytes:
+    """ color555 list, padded to whole banks of 16 colors """
+    colors = list(colors)[:256]
+    colors += [0] * (-len(colors) % 16)
+    return struct.pack("<{}H".format(len(colors)), *colors)
+
+
+# manifest
+
+def convert(asset: dict, base_dir: str) -> dict:
+    """ constants (suffix -> value) of one asset """
+    kind = asset["kind"]
+    out = {}
+    image = None
+    if "image" in asset:
+        image = read_png(os.path.join(base_dir, asset["image"]))
+    bpp = asset.get("bpp", 8)
+    if bpp not in (4, 8):
+        raise AssetError("bpp is 4 or 8")
+    if kind == "tiles":
+        width, height, pixels, palette = image
+        cells = cut_cells(width, height, pixels)
+        if len(cells) > charblock_tiles(bpp):
+            raise AssetError("too many tiles for one charblock: " + str(len(cells)))
+        out["TILES"] = b"".join(pack_cell(cell, bpp) for cell in cells)
+        out["TILE_COUNT"] = len(cells)
+        out["BPP"] = bpp
+        out["PALETTE"] = pack_palette(palette)
+    elif kind == "map" and image is not None:
+        width, height, pixels, palette = image
+        regular = asset.get("regular", True)
+        tiles, count, blob, tile_w, tile_h = map_from_image(
+            width, height, pixels, bpp, regular, asset.get("palette_bank", 0))
+        out["TILES"] = tiles
+        out["TILE_COUNT"] = count
+        out["BPP"] = bpp
+        out["PALETTE"] = pack_palette(palette)
+        out["MAP"] = blob
+        out["MAP_SIZE"] = (tile_w, tile_h)
+        out["MAP_REGULAR"] = regular
+    elif kind == "map":
+        out["MAP"] = map_from_cells(asset)
+        out["MAP_SIZE"] = (asset["width"], asset["height"])
+        out["MAP_REGULAR"] = asset.get("regular", True)
+    elif kind == "palette":
+        colors = [parse_color(c) for c in asset["colors"]] if "colors" in asset else image[3]
+        out["PALETTE"] = pack_palette(colors)
+    else:
+        raise AssetError("unknown asset kind: " + kind)
+    method = asset.get("compress")
+    if method:
+        compressed = False
+        for suffix in ("TILES", "MAP"):
+            if suffix in out:
+                out[suffix] = compress(out[suffix], method)
+                compressed = True
+        if compressed:
+            out["COMPRESSED"] = True
+    return out
+
+
+def _bytes_literal(data: bytes) -> str:
+    if len(data) <= 32:
+        return repr(data)
+    lines = [repr(data[i: i + 32]) for i in range(0, len(data), 32)]
+    return "(\n    " + "\n    ".join(lines) + "\n)"
+
+
+def render_module(constants: dict, source: str) -> str:
+    lines = ["# generated by tools/asset_pipeline.py from " + source + ", do not edit", ""]
+    for name, value in constants.items():
+        text = _bytes_literal(value) if isinstance(value, bytes) else repr(value)
+        lines.append("{} = {}".format(name, text))
+    return "\n".join(lines) + "\n"
+
+
+def build(manifest_path: str, root_dir: str = None) -> str:
+    """ convert every asset of the manifest, return the path of the written module """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    root_dir = root_dir or os.getcwd()
+    constants = {}
+    for asset in manifest.get("assets", []):
+        prefix = asset["name"].upper()
+        try:
+            for suffix, value in convert(asset, base_dir).items():
+                constants[prefix + "_" + suffix] = value
+        except (AssetError, CompressError, KeyError) as e:
+            raise AssetError("{}: {}".format(asset["name"], e))
+    output = os.path.join(root_dir, manifest.get("output", "lib/gba_assets.py"))
+    text = render_module(constants, os.path.relpath(manifest_path, root_dir))
+    # keep the old file (and its timestamp) when nothing changed
+    if os.path.exists(output):
+        with open(output) as f:
+            if f.read() == text:
+                return output
+    with open(output, "w") as f:
+        f.write(text)
+    return output
+
+
+if __name__ == "__main__":
+    print(build(sys.argv[1] if len(sys.argv) > 1 else "assets/manifest.json"))
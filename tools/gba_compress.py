@@ -0,0 +1,258 @@
+"""
+Build time compressors for the GBA BIOS decompression calls (gba_bios.uncomp).
+
+Every stream starts with a header word: type in bits 0-7 (0x10 LZ77, 0x20 | bits Huffman,
+0x30 RL), uncompressed size in bits 8-31, and is padded to a whole word.
+LZ77 never references the previous byte, so the same data works with the vram routine.
+
+    python tools/gba_compress.py lz77|rle|huff|auto input output
+"""
+import heapq
+import struct
+import sys
+
+LZ77 = 0x10
+HUFF = 0x20
+RL = 0x30
+
+LZ77_MIN = 3
+LZ77_MAX = 18
+LZ77_WINDOW = 4096
+_LZ77_CHAIN = 128 # candidates tried per position
+RL_MIN = 3
+RL_MAX = 130
+RL_RAW_MAX = 128
+
+
+class CompressError(Exception):
+    pass
+
+
+def _header(kind: int, size: int) -> bytes:
+    if size >= 1 << 24:
+        raise CompressError("data is too large: " + str(size))
+    return struct.pack("<I", kind | (size << 8))
+
+
+def _pad(data: bytearray) -> bytes:
+    data += bytes(-len(data) % 4)
+    return bytes(data)
+
+
+# LZ77
+
+def lz77_compress(data: bytes) -> bytes:
+    """ greedy LZ77, distances 2-4096 (vram safe), lengths 3-18 """
+    out = bytearray(_header(LZ77, len(data)))
+    chains = {}
+    i = 0
+    n = len(data)
+    while i < n:
+        flag_at = len(out)
+        out.append(0)
+        for bit in range(7, -1, -1):
+            if i >= n:
+                break
+            best_len = 0
+            best_disp = 0
+            if i + LZ77_MIN <= n:
+                limit = min(LZ77_MAX, n - i)
+                for j in reversed(chains.get(data[i: i + LZ77_MIN], ())[-_LZ77_CHAIN:]):
+                    disp = i - j
+                    if disp > LZ77_WINDOW:
+                        break
+                    if disp < 2:
+                        continue
+                    length = LZ77_MIN
+                    while length < limit and data[j + length] == data[i + length]:
+                        length += 1
+                    if length > best_len:
+                        best_len = length
+                        best_disp = disp
+                        if length == limit:
+                            break
+            if best_len >= LZ77_MIN:
+                out[flag_at] |= 1 << bit
+                out.append(((best_len - 3) << 4) | ((best_disp - 1) >> 8))
+                out.append((best_disp - 1) & 0xFF)
+                step = best_len
+            else:
+                out.append(data[i])
+                step = 1
+            for k in range(i, min(i + step, n - LZ77_MIN + 1)):
+                chains.setdefault(data[k: k + LZ77_MIN], []).append(k)
+            i += step
+    return _pad(out)
+
+
+# RL
+
+def rle_compress(data: bytes) -> bytes:
+    out = bytearray(_header(RL, len(data)))
+    raw = bytearray()
+
+    def flush_raw():
+        for k in range(0, len(raw), RL_RAW_MAX):
+            chunk = raw[k: k + RL_RAW_MAX]
+            out.append(len(chunk) - 1)
+            out.extend(chunk)
+        raw.clear()
+
+    i = 0
+    n = len(data)
+    while i < n:
+        run = 1
+        while i + run < n and run < RL_MAX and data[i + run] == data[i]:
+            run += 1
+        if run >= RL_MIN:
+            flush_raw()
+            out.append(0x80 | (run - 3))
+            out.append(data[i])
+            i += run
+        else:
+            raw.append(data[i])
+            i += 1
+    flush_raw()
+    return _pad(out)
+
+
+# Huffman
+
+def _symbols(data: bytes, bits: int):
+    if bits == 8:
+        return list(data)
+    symbols = []
+    for b in data:
+        symbols.append(b & 0xF)
+        symbols.append(b >> 4)
+    return symbols
+
+
+def _build_tree(symbols):
+    """ nested (left, right) tuples, leaves are symbol values """
+    counts = {}
+    for s in symbols:
+        counts[s] = counts.get(s, 0) + 1
+    if len(counts) == 1:
+        # the root must be a node, add an unused symbol
+        counts[(next(iter(counts)) + 1) & 0xFF] = 0
+    heap = [(count, k, symbol) for k, (symbol, count) in enumerate(sorted(counts.items()))]
+    heapq.heapify(heap)
+    k = len(heap)
+    while len(heap) > 1:
+        c0, _, a = heapq.heappop(heap)
+        c1, _, b = heapq.heappop(heap)
+        heapq.heappush(heap, (c0 + c1, k, (a, b)))
+        k += 1
+    return heap[0][2]
+
+
+def _codes(tree, prefix: int = 0, length: int = 0, codes=None) -> dict:
+    if codes is None:
+        codes = {}
+    if isinstance(tree, tuple):
+        _codes(tree[0], prefix << 1, length + 1, codes)
+        _codes(tree[1], (prefix << 1) | 1, length + 1, codes)
+    else:
+        codes[tree] = (prefix, length)
+    return codes
+
+
+def _encode_tree(tree) -> bytes:
+    """ the BIOS tree table: size byte, root, then child pairs, the children of a node at most
+        64 pairs after it (6-bit offsets). pairs are placed depth first, which keeps few nodes
+        waiting, unless a waiting node would miss its limit, then the oldest goes first.
+    """
+    table = bytearray(2)
+    # nodes waiting for their child pair, oldest first: (last allowed pair, node byte index, node),
+    # a node added later never has an earlier limit, so the list stays sorted by limit
+    pending = [(64, 1, tree)]
+    pair = 1
+    while pending:
+        take = -1
+        for i in range(len(pending)):
+            limit = pending[i][0]
+            if limit < pair + i:
+                raise CompressError("huffman tree does not fit the BIOS table")
+            if limit == pair + i:
+                take = 0
+                break
+        _, at, node = pending.pop(take)
+        entry = pair - (at >> 1) - 1
+        table += b"\0\0"
+        for side in (0, 1):
+            child = node[side]
+            child_at = pair * 2 + side
+            if isinstance(child, tuple):
+                pending.append((pair + 64, child_at, child))
+            else:
+                table[child_at] = child
+                entry |= 0x80 if side == 0 else 0x40
+        table[at] = entry
+        pair += 1
+    table += bytes(-len(table) % 4)
+    table[0] = len(table) // 2 - 1
+    return bytes(table)
+
+
+def huff_compress(data: bytes, bits: int = 8) -> bytes:
+    """ 4 or 8 bits symbols, the BIOS writes whole words so the data is padded to 4 bytes """
+    if bits not in (4, 8):
+        raise CompressError("huffman symbols are 4 or 8 bits")
+    data = bytes(data) + bytes(-len(data) % 4)
+    if not data:
+        return _header(HUFF | bits, 0)
+    symbols = _symbols(data, bits)
+    tree = _build_tree(symbols)
+    codes = _codes(tree)
+    out = bytearray(_header(HUFF | bits, len(data)))
+    out += _encode_tree(tree)
+    word = 0
+    used = 0
+    for s in symbols:
+        code, length = codes[s]
+        for bit in range(length - 1, -1, -1):
+            word = (word << 1) | ((code >> bit) & 1)
+            used += 1
+            if used == 32:
+                out += struct.pack("<I", word)
+                word = 0
+                used = 0
+    if used:
+        out += struct.pack("<I", word << (32 - used))
+    return bytes(out)
+
+
+def compress(data: bytes, method: str = "lz77") -> bytes:
+    """ method is lz77, rle, huff (8 bits), huff4, or auto for the smallest """
+    data = bytes(data)
+    if method == "lz77":
+        return lz77_compress(data)
+    if method == "rle":
+        return rle_compress(data)
+    if method == "huff":
+        try:
+            return huff_compress(data, 8)
+        except CompressError as e:
+            print("warning: {}, using lz77".format(e), file=sys.stderr)
+            return lz77_compress(data)
+    if method == "huff4":
+        return huff_compress(data, 4)
+    if method == "auto":
+        best = lz77_compress(data)
+        for candidate in (rle_compress, huff_compress):
+            try:
+                blob = candidate(data)
+            except CompressError:
+                continue
+            if len(blob) < len(best):
+                best = blob
+        return best
+    raise CompressError("unknown compression: " + method)
+
+
+if __name__ == "__main__":
+    with open(sys.argv[2], "rb") as f:
+        blob = compress(f.read(), sys.argv[1])
+    with open(sys.argv[3], "wb") as f:
+        f.write(blob)